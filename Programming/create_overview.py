@@ -1,9 +1,15 @@
 import argparse
 import ast
+import contextlib
+import hashlib
+import io
+import json
 import os
+import sqlite3
 import subprocess
 import sys
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 exclude_dirs = {
     ".venv",
@@ -36,25 +42,146 @@ exclude_files = {
     "frontend/package.json",
     "openai.key",
 }
+# Python files are analyzed in a process pool of this many workers ...
+default_workers = os.cpu_count() or 1
+# ... once there are at least this many of them.
+parallel_min_files = 16
+# Bump whenever analyze_python_file() output changes, so cached results are not reused.
+analysis_version = 2
+default_cache_file = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "create_overview",
+    "analysis_cache.sqlite",
+)
+cache_max_entries = 100000
+# File contents are streamed into the overview in chunks of this many characters ...
+copy_chunk_size = 1 << 20
+output_buffer_size = 8 << 20
+# ... files with a NUL byte in their first sniff_size bytes are skipped as binary ...
+sniff_size = 8192
+# ... and at most this many characters of each file are copied (0 = no limit).
+default_max_file_size = 10 << 20
+# Zip export: extensions left out of the archive, and already-compressed ones stored as-is.
+zip_skip_extensions = (".txt", ".zip", ".svg", ".png")
+zip_stored_extensions = {
+    ".7z", ".avif", ".br", ".bz2", ".docx", ".gif", ".gz", ".jar", ".jpeg", ".jpg", ".mov",
+    ".mp3", ".mp4", ".ogg", ".pdf", ".rar", ".tgz", ".webm", ".webp", ".whl", ".woff",
+    ".woff2", ".xlsx", ".xz", ".zst",
+}
+default_compression_level = 6
+# Sharded overviews: --shard-tokens budgets are converted to characters at this rate.
+chars_per_token = 4
 
 
 # --- Git Metadata Helper ---
-def get_git_metadata(file_path):
-    """Return a string with the last commit hash and date if the file is in a git repo."""
-    cur_path = os.path.abspath(file_path)
+# directory -> enclosing repository root (None outside any repository)
+git_root_cache = {}
+# repository root -> {absolute file path: "<hash> <date>"} (None if git failed)
+git_log_cache = {}
+# repository root -> HEAD commit its git_log_cache entry was read at
+git_log_heads = {}
+
+
+def find_git_root(file_path):
+    """Return the nearest ancestor directory containing .git, caching every directory visited."""
+    cur_path = os.path.dirname(os.path.abspath(file_path))
+    visited = []
+    root = None
     while cur_path and cur_path != os.path.dirname(cur_path):
+        if cur_path in git_root_cache:
+            root = git_root_cache[cur_path]
+            break
+        visited.append(cur_path)
         if os.path.isdir(os.path.join(cur_path, ".git")):
-            try:
-                result = subprocess.check_output(
-                    ["git", "log", "-n", "1", "--pretty=format:%h %ad", file_path],
-                    stderr=subprocess.DEVNULL,
-                    universal_newlines=True,
-                )
-                return result.strip()
-            except Exception:
-                return "Git metadata not available"
+            root = cur_path
+            break
         cur_path = os.path.dirname(cur_path)
-    return "Not in a Git repository"
+    for path in visited:
+        git_root_cache[path] = root
+    return root
+
+
+def read_git_log(repo_root):
+    """
+    Stream `git log --name-only` once for the whole repository and map every
+    path to the newest commit that touched it, as "<hash> <date>".
+    """
+    metadata = {}
+
+    def add(record):
+        header, _, names = record.partition(b"\n")
+        commit = header.decode("utf-8", "replace").strip()
+        for name in names.split(b"\0"):
+            if name:
+                path = os.path.normpath(os.path.join(repo_root, os.fsdecode(name)))
+                metadata.setdefault(path, commit)
+
+    # -z keeps paths unquoted; \x01 marks the start of each commit.
+    process = subprocess.Popen(
+        ["git", "log", "--name-only", "-z", "--pretty=format:%x01%h %ad"],
+        cwd=repo_root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    buffer = b""
+    for chunk in iter(lambda: process.stdout.read(1 << 16), b""):
+        records = (buffer + chunk).split(b"\x01")
+        buffer = records.pop()
+        for record in records:
+            add(record)
+    add(buffer)
+    process.stdout.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, "git log")
+    return metadata
+
+
+def read_git_head(repo_root):
+    """Return the commit HEAD points at, or None (no commits yet, or git failed)."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "-q", "HEAD"],
+            cwd=repo_root,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def refresh_git_log_cache():
+    """
+    Forget the `git log` of every repository whose HEAD moved since it was read.
+    The log only changes with new commits, so edits in the working tree keep it.
+    """
+    for repo_root in list(git_log_cache):
+        if read_git_head(repo_root) != git_log_heads.get(repo_root):
+            del git_log_cache[repo_root]
+            git_log_heads.pop(repo_root, None)
+
+
+def get_git_metadata(file_path):
+    """Return a string with the last commit hash and date if the file is in a git repo."""
+    repo_root = find_git_root(file_path)
+    if repo_root is None:
+        return "Not in a Git repository"
+    if repo_root not in git_log_cache:
+        # Read before the log, so a commit made in between is picked up next time.
+        git_log_heads[repo_root] = read_git_head(repo_root)
+        try:
+            git_log_cache[repo_root] = read_git_log(repo_root)
+        except Exception:
+            git_log_cache[repo_root] = None
+    metadata = git_log_cache[repo_root]
+    if metadata is None:
+        return "Git metadata not available"
+    commit = metadata.get(os.path.abspath(file_path))
+    if commit is None:
+        # Untracked files get the empty string `git log` prints for them; git
+        # errors out on paths that do not exist at all.
+        return "" if os.path.exists(file_path) else "Git metadata not available"
+    return commit
 
 
 # --- AST Analysis Functions ---
@@ -66,17 +193,20 @@ def extract_docstring(node):
     return ""
 
 
-def analyze_python_file(file_path, error_logs):
+def analyze_python_file(file_path, error_logs, with_git=True):
     """
     Analyzes a Python file and returns contextual information including:
       - module_docstring: first-line summary
       - functions_defined: list of dicts with function name,
       - docstring snippet, annotations, line count
       - functions_called: list of function names that are called
+      - calls: the same names grouped by the calling function ("<module>" for top level)
       - imports: list of imported modules (dependencies)
+      - import_aliases: local name -> imported name (relative imports keep their leading dots)
+      - star_imports: modules imported with "from ... import *"
       - classes: list of dicts with class name, bases,
       - docstring snippet, and methods (name, docstring, annotations, line count)
-      - git_metadata: Git info if available
+      - git_metadata: Git info if available (skipped when with_git is False)
     Any errors encountered are appended to error_logs.
     """
     try:
@@ -92,12 +222,16 @@ def analyze_python_file(file_path, error_logs):
     module_docstring = extract_docstring(tree)
     functions_defined = []
     functions_called = []
+    calls = {}
     imports = []
+    import_aliases = {}
+    star_imports = []
     classes = []
 
     class Analyzer(ast.NodeVisitor):
         def __init__(self):
             self.current_class = None
+            self.scope = "<module>"
 
         def visit_FunctionDef(self, node):
             func_info = {
@@ -125,9 +259,14 @@ def analyze_python_file(file_path, error_logs):
                     func_info["returns"] = ""
             if self.current_class is not None:
                 self.current_class["methods"].append(func_info)
+                scope = f"{self.current_class['name']}.{node.name}"
             else:
                 functions_defined.append(func_info)
+                scope = node.name
+            prev_scope = self.scope
+            self.scope = scope
             self.generic_visit(node)
+            self.scope = prev_scope
 
         def visit_Call(self, node):
             name = None
@@ -144,18 +283,30 @@ def analyze_python_file(file_path, error_logs):
                 name = ".".join(reversed(parts))
             if name:
                 functions_called.append(name)
+                calls.setdefault(self.scope, set()).add(name)
             self.generic_visit(node)
 
         def visit_Import(self, node):
             for alias in node.names:
                 imports.append(alias.name)
+                if alias.asname:
+                    import_aliases[alias.asname] = alias.name
+                else:
+                    top = alias.name.split(".")[0]
+                    import_aliases[top] = top
             self.generic_visit(node)
 
         def visit_ImportFrom(self, node):
             module = node.module if node.module else ""
+            prefix = "." * (node.level or 0) + module
             for alias in node.names:
                 imp = f"{module}.{alias.name}" if module else alias.name
                 imports.append(imp)
+                if alias.name == "*":
+                    star_imports.append(prefix)
+                else:
+                    target = f"{prefix}.{alias.name}" if module else prefix + alias.name
+                    import_aliases[alias.asname or alias.name] = target
             self.generic_visit(node)
 
         def visit_ClassDef(self, node):
@@ -177,148 +328,826 @@ def analyze_python_file(file_path, error_logs):
         "module_docstring": module_docstring,
         "functions_defined": functions_defined,
         "functions_called": sorted(set(functions_called)),
+        "calls": {scope: sorted(names) for scope, names in calls.items()},
         "imports": sorted(set(imports)),
+        "import_aliases": import_aliases,
+        "star_imports": star_imports,
         "classes": classes,
-        "git_metadata": get_git_metadata(file_path),
     }
+    if with_git:
+        analysis["git_metadata"] = get_git_metadata(file_path)
     return analysis
 
 
+# --- Analysis Cache ---
+class AnalysisCache:
+    """
+    Persistent cache of analyze_python_file() results, keyed by absolute path
+    and checked against the file's size and mtime. When only the mtime moved,
+    a content hash decides. Entries from another tool or Python version never
+    match, and the least recently used entries beyond max_entries are evicted.
+    """
+
+    def __init__(self, path=default_cache_file, max_entries=cache_max_entries):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.version = f"{analysis_version}:py{sys.version_info[0]}.{sys.version_info[1]}"
+        self.hits = 0
+        self.misses = 0
+        self.stats = {}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, "
+            "sha256 TEXT NOT NULL, version TEXT NOT NULL, analysis TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS analyses_used ON analyses (used)")
+        self.clock = self.conn.execute("SELECT COALESCE(MAX(used), 0) FROM analyses").fetchone()[0]
+
+    @staticmethod
+    def hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, file_path):
+        """Return the cached analysis for file_path, or None if it has to be analyzed."""
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        # Remembered so put() only stores results for the file as it was analyzed.
+        self.stats[path] = (st.st_size, st.st_mtime_ns)
+        row = self.conn.execute(
+            "SELECT size, mtime, sha256, version, analysis FROM analyses WHERE path = ?", (path,)
+        ).fetchone()
+        hit = row is not None and row[3] == self.version and row[0] == st.st_size
+        if hit and row[1] != st.st_mtime_ns:
+            hit = self.hash_file(path) == row[2]
+        if not hit:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.clock += 1
+        self.conn.execute(
+            "UPDATE analyses SET mtime = ?, used = ? WHERE path = ?", (st.st_mtime_ns, self.clock, path)
+        )
+        return json.loads(row[4])
+
+    def put(self, file_path, analysis):
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+            digest = self.hash_file(path)
+        except OSError:
+            return
+        if self.stats.get(path) != (st.st_size, st.st_mtime_ns):
+            return
+        self.clock += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analyses (path, size, mtime, sha256, version, analysis, used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, digest, self.version, json.dumps(analysis), self.clock),
+        )
+
+    def close(self):
+        self.conn.execute(
+            "DELETE FROM analyses WHERE path NOT IN "
+            "(SELECT path FROM analyses ORDER BY used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self.conn.commit()
+        self.conn.close()
+        print(f"Analysis cache: {self.hits} hits, {self.misses} misses")
+
+
+def open_cache(cache_file):
+    """Open the analysis cache, or return None (no caching) if it is disabled or unusable."""
+    if not cache_file:
+        return None
+    try:
+        return AnalysisCache(cache_file)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Analysis cache disabled: {e}")
+        return None
+
+
+def analyze_file_task(file_path):
+    """
+    Process-pool entry point: analyze one file and hand back its analysis,
+    its errors and whatever it printed, so the parent can replay them in order.
+    """
+    error_logs = []
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        analysis = analyze_python_file(file_path, error_logs, with_git=False)
+    return analysis, error_logs, output.getvalue()
+
+
+def analyze_python_files(python_files, error_logs, workers=None, cache=None, file_errors=None):
+    """
+    Analyze python_files, in a process pool when there are enough of them,
+    skipping files whose analysis is in cache.
+    Returns {file_path: analysis} in input order; errors and messages are
+    reported in input order too, so the result matches a serial run exactly.
+    If file_errors is given, it also receives each file's errors by path.
+    """
+    workers = default_workers if workers is None else workers
+    results = [None] * len(python_files)
+    todo = []
+    for i, file_path in enumerate(python_files):
+        analysis = cache.get(file_path) if cache else None
+        if analysis is None:
+            todo.append(i)
+        else:
+            results[i] = (analysis, [], "")
+
+    pending = [python_files[i] for i in todo]
+    if workers > 1 and len(pending) >= parallel_min_files:
+        chunksize = max(1, min(64, len(pending) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            analyzed = list(pool.map(analyze_file_task, pending, chunksize=chunksize))
+    else:
+        analyzed = map(analyze_file_task, pending)
+    for i, result in zip(todo, analyzed):
+        results[i] = result
+        # Only clean results are cached; failures are retried (and reported) every run.
+        if cache and result[0] and not result[1] and not result[2]:
+            cache.put(python_files[i], result[0])
+
+    file_analysis = {}
+    for file_path, (analysis, errors, output) in zip(python_files, results):
+        sys.stdout.write(output)
+        error_logs.extend(errors)
+        if file_errors is not None:
+            file_errors[file_path] = errors
+        # Git metadata comes from the parent's cache: one `git log` per repository.
+        if analysis:
+            analysis["git_metadata"] = get_git_metadata(file_path)
+        file_analysis[file_path] = analysis
+    return file_analysis
+
+
+# --- Cross-File Call Graph ---
+class CallGraph:
+    """
+    Symbol table and call graph over analyzed Python files.
+    Symbols are (file_path, qualname) pairs for functions, classes and methods
+    ("Class.method"), plus "<module>" for top-level code. Calls are resolved
+    through each file's imports and aliases rather than by bare name, edges
+    are deduplicated, and callers/callees are kept as inverted indexes.
+    """
+
+    module_scope = "<module>"
+
+    def __init__(self, python_files, file_analysis):
+        self.files = [f for f in dict.fromkeys(python_files) if f in file_analysis]
+        self.symbols = []  # symbol id -> (file_path, qualname)
+        self.symbol_ids = {file: {} for file in self.files}  # file_path -> {qualname: id}
+        self.callees = {}  # caller id -> set of callee ids
+        self.callers = {}  # callee id -> set of caller ids
+        self.call_sites = 0
+        self.resolved = 0
+        self.module_index = {}  # dotted module name (and each dotted suffix) -> [file_path]
+        self.path_index = {}  # absolute module path without ".py" -> file_path
+        self.directories = {}  # file_path -> absolute directory
+        self.module_cache = {}
+        self.target_cache = {}
+
+        for file in self.files:
+            analysis = file_analysis[file]
+            for func in analysis.get("functions_defined", []):
+                self.add_symbol(file, func["name"])
+            for cls in analysis.get("classes", []):
+                self.add_symbol(file, cls["name"])
+                for method in cls.get("methods", []):
+                    self.add_symbol(file, f"{cls['name']}.{method['name']}")
+        self.index_modules()
+
+        for file in self.files:
+            analysis = file_analysis[file]
+            aliases = analysis.get("import_aliases", {})
+            stars = analysis.get("star_imports", [])
+            for scope, names in analysis.get("calls", {}).items():
+                caller = self.symbol_ids[file].get(scope)
+                if caller is None:
+                    caller = self.add_symbol(file, scope)
+                for name in names:
+                    self.call_sites += 1
+                    callee = self.resolve_call(file, scope, name, aliases, stars)
+                    if callee is not None:
+                        self.resolved += 1
+                        self.callees.setdefault(caller, set()).add(callee)
+                        self.callers.setdefault(callee, set()).add(caller)
+
+    def add_symbol(self, file, qualname):
+        ids = self.symbol_ids[file]
+        if qualname not in ids:
+            ids[qualname] = len(self.symbols)
+            self.symbols.append((file, qualname))
+        return ids[qualname]
+
+    def index_modules(self):
+        paths = [os.path.abspath(f) for f in self.files]
+        root = os.path.commonpath([os.path.dirname(p) for p in paths]) if paths else ""
+        # Module names start above the outermost package, so "import pkg.mod" resolves.
+        while root and os.path.exists(os.path.join(root, "__init__.py")):
+            root = os.path.dirname(root)
+        for file, path in zip(self.files, paths):
+            self.directories[file] = os.path.dirname(path)
+            module_path = os.path.splitext(path)[0]
+            if os.path.basename(module_path) == "__init__":
+                module_path = os.path.dirname(module_path)
+            self.path_index[module_path] = file
+            parts = os.path.relpath(module_path, root).split(os.sep)
+            if parts == ["."]:
+                continue
+            for k in range(len(parts)):
+                self.module_index.setdefault(".".join(parts[k:]), []).append(file)
+
+    def find_module(self, directory, module):
+        """Return the file for a dotted module name as seen from directory, preferring the nearest one."""
+        key = (directory, module)
+        if key not in self.module_cache:
+            candidates = self.module_index.get(module, [])
+            if len(candidates) > 1:
+                candidates = sorted(
+                    candidates,
+                    key=lambda c: -len(os.path.commonpath([directory, self.directories[c]])),
+                )
+            self.module_cache[key] = candidates[0] if candidates else None
+        return self.module_cache[key]
+
+    def resolve_qualified(self, file, target):
+        """Resolve an imported dotted name (e.g. "pkg.mod.func" or "..mod.Class") to a symbol id."""
+        directory = self.directories[file]
+        key = (directory, target)
+        if key in self.target_cache:
+            return self.target_cache[key]
+        callee = None
+        level = len(target) - len(target.lstrip("."))
+        parts = target[level:].split(".") if target[level:] else []
+        if level:
+            base = directory
+            for _ in range(level - 1):
+                base = os.path.dirname(base)
+            for i in range(len(parts), -1, -1):
+                module_file = self.path_index.get(os.path.join(base, *parts[:i]))
+                if module_file is not None:
+                    callee = self.symbol_ids[module_file].get(".".join(parts[i:]))
+                    break
+        else:
+            for i in range(len(parts) - 1, 0, -1):
+                module_file = self.find_module(directory, ".".join(parts[:i]))
+                if module_file is not None:
+                    callee = self.symbol_ids[module_file].get(".".join(parts[i:]))
+                    break
+        self.target_cache[key] = callee
+        return callee
+
+    def resolve_call(self, file, scope, name, aliases, stars):
+        local = self.symbol_ids[file]
+        if name in local:
+            return local[name]
+        head, _, rest = name.partition(".")
+        if head in aliases:
+            return self.resolve_qualified(file, f"{aliases[head]}.{rest}" if rest else aliases[head])
+        if head in ("self", "cls") and rest and "." in scope:
+            return local.get(f"{scope.split('.')[0]}.{rest}")
+        if not rest:
+            for module in stars:
+                callee = self.resolve_qualified(file, f"{module}.{name}")
+                if callee is not None:
+                    return callee
+        return None
+
+    def callers_of(self, file, qualname):
+        """Return the (file_path, qualname) symbols that call the given symbol."""
+        callee = self.symbol_ids.get(file, {}).get(qualname)
+        return sorted(self.symbols[c] for c in self.callers.get(callee, ()))
+
+    def callees_of(self, file, qualname):
+        """Return the (file_path, qualname) symbols called by the given symbol."""
+        caller = self.symbol_ids.get(file, {}).get(qualname)
+        return sorted(self.symbols[c] for c in self.callees.get(caller, ()))
+
+    def incoming_calls(self):
+        """
+        Returns a mapping: file_path -> { qualname: [files that call it] },
+        leaving out calls from the defining file itself.
+        """
+        order = {file: i for i, file in enumerate(self.files)}
+        incoming_calls = {file: {} for file in self.files}
+        for callee in sorted(self.callers, key=lambda c: self.symbols[c]):
+            file, qualname = self.symbols[callee]
+            caller_files = {self.symbols[c][0] for c in self.callers[callee]} - {file}
+            if caller_files:
+                incoming_calls[file][qualname] = sorted(caller_files, key=order.get)
+        return incoming_calls
+
+    def to_dict(self):
+        """Compact form: symbols as [file index, qualname] and edges as [caller, callee] ids."""
+        file_ids = {file: i for i, file in enumerate(self.files)}
+        return {
+            "files": self.files,
+            "symbols": [[file_ids[file], qualname] for file, qualname in self.symbols],
+            "edges": sorted([caller, callee] for caller in self.callees for callee in self.callees[caller]),
+            "call_sites": self.call_sites,
+            "resolved_calls": self.resolved,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, separators=(",", ":"))
+
+
 def perform_cross_file_analysis(python_files, file_analysis, error_logs):
     """
     Performs cross-file analysis over the provided Python files.
     file_analysis is a dictionary mapping file_path to its analysis.
     Returns a mapping: file_path -> { function_name: [list of files that call that function] }.
     """
-    # Build mapping from function names to list of files where they are defined.
-    function_definitions = {}
-    for file, analysis in file_analysis.items():
-        for func in analysis.get("functions_defined", []):
-            function_definitions.setdefault(func["name"], []).append(file)
-        for cls in analysis.get("classes", []):
-            for method in cls.get("methods", []):
-                function_definitions.setdefault(method["name"], []).append(file)
-
-    incoming_calls = {file: {} for file in file_analysis}
-    for file, analysis in file_analysis.items():
-        for called_func in analysis.get("functions_called", []):
-            if called_func in function_definitions:
-                for def_file in function_definitions[called_func]:
-                    if def_file != file:
-                        incoming_calls[def_file].setdefault(called_func, []).append(file)
-    return incoming_calls
+    return CallGraph(python_files, file_analysis).incoming_calls()
 
 
 # --- File/Directory Operations ---
-def combine_files_in_directory(directory, output_file):
+def write_file_content(outfile, file_path, error_logs, max_file_size=None):
     """
-    Combine all files in the directory recursively (with enriched contextual analysis) into one output file.
-    Excludes specified directories and files.
-    Errors encountered during file processing are collected and reported.
+    Stream the content of file_path into outfile between content markers.
+    Binary files are replaced by a one-line note, and content beyond
+    max_file_size characters by a truncation marker.
     """
-    error_logs = []
+    max_file_size = default_max_file_size if max_file_size is None else max_file_size
+    try:
+        with open(file_path, "rb") as raw:
+            size = os.fstat(raw.fileno()).st_size
+            if b"\0" in raw.read(sniff_size):
+                outfile.write(f"\n--- Binary file skipped ({size} bytes) ---\n")
+                return
+            raw.seek(0)
+            infile = io.TextIOWrapper(raw, encoding="utf-8")
+            outfile.write("\n--- File Content Start ---\n")
+            remaining = max_file_size or size + 1
+            while remaining > 0:
+                chunk = infile.read(min(copy_chunk_size, remaining))
+                if not chunk:
+                    break
+                outfile.write(chunk)
+                remaining -= len(chunk)
+            if max_file_size and infile.read(1):
+                outfile.write(
+                    f"\n--- Truncated after {max_file_size} characters ({size} bytes in total) ---"
+                )
+            outfile.write("\n--- File Content End ---\n")
+    except Exception as e:
+        msg = f"Could not read {file_path}: {e}"
+        print(msg)
+        error_logs.append(msg)
+
+
+def is_excluded_dir(name):
+    return name.startswith("__") or name.startswith(".") or name in exclude_dirs
+
 
-    python_files = []
-    all_files = []  # List of tuples: (full_file_path, relative_path)
+def is_excluded_file(name):
+    return name.startswith(".") or name in exclude_files or name.endswith(".txt")
+
+
+def is_excluded_path(path, exclude):
+    """Whether path, or a directory above it, is one of the absolute paths in exclude."""
+    path = os.path.abspath(path)
+    while path not in exclude:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+    return True
+
+
+def list_directory_files(directory, exclude=None):
+    """
+    Walk the directory once, applying the exclusion filters. exclude is an optional
+    set of absolute paths (files or whole directories) to leave out as well.
+    Returns a list of tuples: (full_file_path, relative_path).
+    """
+    all_files = []
     for root, dirs, files in os.walk(directory):
-        dirs[:] = [
-            d
-            for d in dirs
-            if not d.startswith("__") and not d.startswith(".") and d not in exclude_dirs
-        ]
+        dirs[:] = [d for d in dirs if not is_excluded_dir(d)]
+        if exclude:
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in exclude]
         for file in files:
-            if file.startswith(".") or file in exclude_files or file.endswith(".txt"):
+            if is_excluded_file(file):
                 continue
             file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, directory)
-            all_files.append((file_path, relative_path))
-            if file.endswith(".py"):
-                python_files.append(file_path)
+            if exclude and os.path.abspath(file_path) in exclude:
+                continue
+            all_files.append((file_path, os.path.relpath(file_path, directory)))
+    return all_files
+
+
+def write_python_analysis(outfile, analysis, file_incoming):
+    """
+    Write the contextual analysis block of a Python file: its analysis and
+    file_incoming, the { function_name: [calling files] } part of incoming_calls.
+    """
+    outfile.write("### Contextual Analysis ###\n")
+    outfile.write(f"Module Docstring: {analysis.get('module_docstring', 'None')}\n")
+    outfile.write(f"Git Metadata: {analysis.get('git_metadata', 'N/A')}\n\n")
+    outfile.write("Functions Defined:\n")
+    for func in analysis.get("functions_defined", []):
+        outfile.write(f"  {func['name']} (Lines: {func['lines']}): {func['doc']}\n")
+        if func["args"]:
+            args = ", ".join(f"{k}: {v}" if v else k for k, v in func["args"].items())
+            outfile.write(f"    Args: {args}\n")
+        if func["returns"]:
+            outfile.write(f"    Returns: {func['returns']}\n")
+    outfile.write("\nFunctions Called:\n")
+    outfile.write(", ".join(analysis.get("functions_called", [])) + "\n\n")
+    outfile.write("Imports / Dependencies:\n")
+    outfile.write(", ".join(analysis.get("imports", [])) + "\n\n")
+    outfile.write("Classes:\n")
+    for cls in analysis.get("classes", []):
+        outfile.write(f"  Class {cls['name']} (Bases: {', '.join(cls['bases'])}) - {cls['doc']}\n")
+        for method in cls.get("methods", []):
+            outfile.write(
+                f"    Method {method['name']} (Lines: {method['lines']}): {method['doc']}\n"
+            )
+            if method["args"]:
+                args = ", ".join(f"{k}: {v}" if v else k for k, v in method["args"].items())
+                outfile.write(f"      Args: {args}\n")
+            if method["returns"]:
+                outfile.write(f"      Returns: {method['returns']}\n")
+    if file_incoming:
+        outfile.write("\nIncoming Calls (from other files):\n")
+        for func, callers in file_incoming.items():
+            outfile.write(f"  {func}: called from {', '.join(callers)}\n")
+    else:
+        outfile.write("\nNo incoming calls from other files detected.\n")
+
+
+def write_directory_overview(
+    outfile, all_files, error_logs, workers=None, cache=None, max_file_size=None
+):
+    """
+    Write the overview of all_files (as returned by list_directory_files) to outfile,
+    followed by the errors encountered. Returns the CallGraph of the Python files.
+    """
+    python_files = [file_path for file_path, _ in all_files if file_path.endswith(".py")]
 
     # Cache analysis for each Python file once.
-    file_analysis = {}
-    for file in python_files:
-        file_analysis[file] = analyze_python_file(file, error_logs)
+    file_analysis = analyze_python_files(python_files, error_logs, workers, cache)
 
     # Perform cross-file analysis using the cached analysis.
-    incoming_calls = perform_cross_file_analysis(python_files, file_analysis, error_logs)
+    call_graph = CallGraph(python_files, file_analysis)
+    incoming_calls = call_graph.incoming_calls()
 
-    with open(output_file, "w", encoding="utf-8") as outfile:
-        for file_path, relative_path in all_files:
-            outfile.write(f"\n\n--- File: {relative_path} ---\n")
-            if file_path.endswith(".py"):
-                analysis = file_analysis.get(file_path, {})
-                outfile.write("### Contextual Analysis ###\n")
-                outfile.write(f"Module Docstring: {analysis.get('module_docstring', 'None')}\n")
-                outfile.write(f"Git Metadata: {analysis.get('git_metadata', 'N/A')}\n\n")
-                outfile.write("Functions Defined:\n")
-                for func in analysis.get("functions_defined", []):
-                    outfile.write(f"  {func['name']} (Lines: {func['lines']}): {func['doc']}\n")
-                    if func["args"]:
-                        args = ", ".join(f"{k}: {v}" if v else k for k, v in func["args"].items())
-                        outfile.write(f"    Args: {args}\n")
-                    if func["returns"]:
-                        outfile.write(f"    Returns: {func['returns']}\n")
-                outfile.write("\nFunctions Called:\n")
-                outfile.write(", ".join(analysis.get("functions_called", [])) + "\n\n")
-                outfile.write("Imports / Dependencies:\n")
-                outfile.write(", ".join(analysis.get("imports", [])) + "\n\n")
-                outfile.write("Classes:\n")
-                for cls in analysis.get("classes", []):
-                    outfile.write(
-                        f"  Class {cls['name']} (Bases: {', '.join(cls['bases'])}) - {cls['doc']}\n"
-                    )
-                    for method in cls.get("methods", []):
-                        outfile.write(
-                            f"    Method {method['name']} (Lines: {method['lines']}): {method['doc']}\n"
+    for file_path, relative_path in all_files:
+        outfile.write(f"\n\n--- File: {relative_path} ---\n")
+        if file_path.endswith(".py"):
+            write_python_analysis(
+                outfile, file_analysis.get(file_path, {}), incoming_calls.get(file_path, {})
+            )
+        write_file_content(outfile, file_path, error_logs, max_file_size)
+    # Report errors, if any.
+    if error_logs:
+        outfile.write("\n### Errors Encountered ###\n")
+        for error in error_logs:
+            outfile.write(error + "\n")
+    return call_graph
+
+
+def combine_files_in_directory(
+    directory, output_file, workers=None, cache=None, max_file_size=None
+):
+    """
+    Combine all files in the directory recursively (with enriched contextual analysis) into one output file.
+    Excludes specified directories and files.
+    Errors encountered during file processing are collected and reported.
+    Returns the CallGraph of the Python files.
+    """
+    error_logs = []
+    all_files = list_directory_files(directory)
+    with open(output_file, "w", encoding="utf-8", buffering=output_buffer_size) as outfile:
+        return write_directory_overview(
+            outfile, all_files, error_logs, workers, cache, max_file_size
+        )
+
+
+class IncrementalOverview:
+    """
+    Keeps the overview of a directory up to date for watch mode. Analyses, errors
+    and the byte span of every file's content in the last written overview are kept
+    between updates, so update() only re-analyzes the touched Python files and copies
+    the content of every other file from the previous overview instead of re-reading
+    it. The result is the same as a fresh combine_files_in_directory() run, except
+    that paths in exclude (absolute files or directories, such as other outputs
+    written into the directory) are left out.
+    """
+
+    def __init__(self, directory, output_file, workers=None, cache=None, max_file_size=None,
+                 exclude=()):
+        self.directory = directory
+        self.output_file = output_file
+        self.workers = workers
+        self.cache = cache
+        self.max_file_size = max_file_size
+        # Written next to the output as a dot file, then renamed, so readers never
+        # see a half-written overview.
+        self.temp_file = os.path.join(
+            os.path.dirname(self.output_file), f".{os.path.basename(self.output_file)}.tmp"
+        )
+        # The overview never lists itself, whatever its name.
+        self.exclude = {os.path.abspath(path) for path in (output_file, self.temp_file, *exclude)}
+        self.all_files = []
+        self.file_analysis = {}
+        self.analysis_errors = {}  # file_path -> errors from analyzing it
+        self.spans = {}  # file_path -> (start, end, stat, errors) of its content in output_file
+
+    def file_path(self, path):
+        """Map a path (absolute or relative to the working directory) to its overview file_path,
+        or return None if the overview leaves it out."""
+        relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.directory))
+        parts = relative_path.split(os.sep)
+        if parts[0] == ".." or is_excluded_file(parts[-1]):
+            return None
+        if self.exclude and is_excluded_path(path, self.exclude):
+            return None
+        if any(is_excluded_dir(part) for part in parts[:-1]):
+            return None
+        return os.path.join(self.directory, relative_path)
+
+    def build(self):
+        """Analyze every file and write the overview from scratch. Returns the CallGraph."""
+        self.all_files = list_directory_files(self.directory, self.exclude)
+        python_files = [file_path for file_path, _ in self.all_files if file_path.endswith(".py")]
+        self.analysis_errors = {}
+        self.file_analysis = analyze_python_files(
+            python_files, [], self.workers, self.cache, self.analysis_errors
+        )
+        self.spans = {}
+        return self.write(set())
+
+    def update(self, touched=None):
+        """
+        Bring the overview up to date after the files in touched (paths as accepted by
+        file_path()) changed, appeared or disappeared. With touched=None the directory
+        is rescanned and files whose size or mtime moved count as touched.
+        Returns (number of touched files, CallGraph).
+        """
+        known = {file_path for file_path, _ in self.all_files}
+        if touched is None:
+            self.all_files = list_directory_files(self.directory, self.exclude)
+            touched = set()
+            for file_path, _ in self.all_files:
+                span = self.spans.get(file_path)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                if span is None or span[2] != (st.st_size, st.st_mtime_ns):
+                    touched.add(file_path)
+        else:
+            touched = {fp for fp in map(self.file_path, touched) if fp is not None}
+            if any(fp not in known or not os.path.exists(fp) for fp in touched):
+                self.all_files = list_directory_files(self.directory, self.exclude)
+        current = {file_path for file_path, _ in self.all_files}
+        touched &= current
+        for file_path in known - current:
+            self.file_analysis.pop(file_path, None)
+            self.analysis_errors.pop(file_path, None)
+
+        # Commits since the last update change the git metadata of re-analyzed files.
+        refresh_git_log_cache()
+        stale = [fp for fp, _ in self.all_files if fp in touched and fp.endswith(".py")]
+        self.file_analysis.update(
+            analyze_python_files(stale, [], self.workers, self.cache, self.analysis_errors)
+        )
+        return len(touched), self.write(touched)
+
+    def write(self, touched):
+        python_files = [file_path for file_path, _ in self.all_files if file_path.endswith(".py")]
+        call_graph = CallGraph(python_files, self.file_analysis)
+        incoming_calls = call_graph.incoming_calls()
+        spans = {}
+        previous = None
+        if self.spans and os.path.exists(self.output_file):
+            previous = open(self.output_file, "rb")
+        try:
+            with open(self.temp_file, "w", encoding="utf-8", buffering=output_buffer_size) as outfile:
+                for file_path, relative_path in self.all_files:
+                    outfile.write(f"\n\n--- File: {relative_path} ---\n")
+                    if file_path.endswith(".py"):
+                        write_python_analysis(
+                            outfile,
+                            self.file_analysis.get(file_path, {}),
+                            incoming_calls.get(file_path, {}),
                         )
-                        if method["args"]:
-                            args = ", ".join(
-                                f"{k}: {v}" if v else k for k, v in method["args"].items()
-                            )
-                            outfile.write(f"      Args: {args}\n")
-                        if method["returns"]:
-                            outfile.write(f"      Returns: {method['returns']}\n")
-                file_incoming = incoming_calls.get(file_path, {})
-                if file_incoming:
-                    outfile.write("\nIncoming Calls (from other files):\n")
-                    for func, callers in file_incoming.items():
-                        outfile.write(f"  {func}: called from {', '.join(callers)}\n")
-                else:
-                    outfile.write("\nNo incoming calls from other files detected.\n")
-            try:
-                with open(file_path, "r", encoding="utf-8") as infile:
-                    outfile.write("\n--- File Content Start ---\n")
-                    outfile.write(infile.read())
-                    outfile.write("\n--- File Content End ---\n")
-            except Exception as e:
-                msg = f"Could not read {file_path}: {e}"
-                print(msg)
-                error_logs.append(msg)
-        # Report errors, if any.
-        if error_logs:
+                    start = outfile.tell()
+                    span = self.spans.get(file_path)
+                    if previous and span and file_path not in touched:
+                        stat, errors = span[2], span[3]
+                        outfile.flush()
+                        previous.seek(span[0])
+                        remaining = span[1] - span[0]
+                        while remaining > 0:
+                            chunk = previous.read(min(copy_chunk_size, remaining))
+                            if not chunk:
+                                break
+                            outfile.buffer.write(chunk)
+                            remaining -= len(chunk)
+                    else:
+                        errors = []
+                        try:
+                            st = os.stat(file_path)
+                            stat = (st.st_size, st.st_mtime_ns)
+                        except OSError:
+                            stat = None
+                        write_file_content(outfile, file_path, errors, self.max_file_size)
+                    spans[file_path] = (start, outfile.tell(), stat, errors)
+                error_logs = [e for fp in python_files for e in self.analysis_errors.get(fp, [])]
+                error_logs += [e for fp, _ in self.all_files for e in spans[fp][3]]
+                if error_logs:
+                    outfile.write("\n### Errors Encountered ###\n")
+                    for error in error_logs:
+                        outfile.write(error + "\n")
+        finally:
+            if previous:
+                previous.close()
+        os.replace(self.temp_file, self.output_file)
+        self.spans = spans
+        return call_graph
+
+
+def plan_shards(entries, shards=None, shard_size=None):
+    """
+    Split entries, a list of (item, estimated_size) in walk order, into contiguous
+    shards so that files from the same directory stay together and no file is split.
+    With shard_size, a shard is closed before it would exceed that size (a single
+    larger file gets a shard of its own); otherwise the total is spread over at most
+    shards shards. Returns a list of non-empty lists of items.
+    """
+    plan = []
+    if shard_size:
+        current, current_size = [], 0
+        for item, size in entries:
+            if current and current_size + size > shard_size:
+                plan.append(current)
+                current, current_size = [], 0
+            current.append(item)
+            current_size += size
+        if current:
+            plan.append(current)
+        return plan
+
+    shards = max(1, shards or 1)
+    target = max(1, sum(size for _, size in entries)) / shards
+    done = 0
+    for item, size in entries:
+        # Each file goes to the shard its midpoint falls into, which keeps shards contiguous.
+        index = min(shards - 1, int((done + size / 2) / target))
+        if not plan or index > plan[-1][0]:
+            plan.append((index, []))
+        plan[-1][1].append(item)
+        done += size
+    return [items for _, items in plan]
+
+
+def shard_file_name(output_file, index):
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{index:03d}{ext}"
+
+
+def remove_stale_shards(output_file, shard_paths):
+    """Delete shards of output_file that are not in shard_paths, left over from a run that wrote more."""
+    directory = os.path.dirname(output_file) or "."
+    root, ext = os.path.splitext(os.path.basename(output_file))
+    keep = {os.path.basename(shard_path) for shard_path in shard_paths}
+    for name in os.listdir(directory):
+        if name in keep or not name.startswith(root + "_") or not name.endswith(ext):
+            continue
+        number = name[len(root) + 1:len(name) - len(ext)]
+        if len(number) >= 3 and number.isdigit():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, name))
+
+
+def write_overview_shard(shard_path, shard_files, analysis_blocks, max_file_size, errors=()):
+    """
+    Write one shard: for each (file_path, relative_path) its header, pre-rendered
+    analysis block and content, followed by errors (if given) and the errors met
+    while reading the files. Returns (reading errors, bytes written).
+    """
+    error_logs = []
+    with open(shard_path, "w", encoding="utf-8", buffering=output_buffer_size) as outfile:
+        for file_path, relative_path in shard_files:
+            outfile.write(f"\n\n--- File: {relative_path} ---\n")
+            outfile.write(analysis_blocks.get(file_path, ""))
+            write_file_content(outfile, file_path, error_logs, max_file_size)
+        if errors or error_logs:
             outfile.write("\n### Errors Encountered ###\n")
-            for error in error_logs:
+            for error in list(errors) + error_logs:
                 outfile.write(error + "\n")
+    return error_logs, os.path.getsize(shard_path)
 
 
-def combine_files_from_list(file_list, output_file):
+def combine_files_in_directory_sharded(
+    directory,
+    output_file,
+    shards=None,
+    shard_size=None,
+    workers=None,
+    cache=None,
+    max_file_size=None,
+):
+    """
+    Like combine_files_in_directory(), but split the overview into shards named after
+    output_file (Project_Overview_001.txt, ...), either at most shards of them or each
+    about shard_size characters. Shards are written concurrently, and a manifest
+    (Project_Overview_manifest.json) lists the files in every shard together with
+    the errors encountered. Shards left over from an earlier run that wrote more of
+    them are removed. Returns the CallGraph of the Python files.
+    """
+    max_file_size = default_max_file_size if max_file_size is None else max_file_size
+    workers = default_workers if workers is None else workers
+    error_logs = []
+    all_files = list_directory_files(directory)
+    python_files = [file_path for file_path, _ in all_files if file_path.endswith(".py")]
+    file_analysis = analyze_python_files(python_files, error_logs, workers, cache)
+    call_graph = CallGraph(python_files, file_analysis)
+    incoming_calls = call_graph.incoming_calls()
+
+    # Analysis blocks are rendered up front, so shard sizes can be estimated exactly
+    # apart from the file contents, which are estimated from their (capped) size.
+    analysis_blocks = {}
+    for file_path in python_files:
+        block = io.StringIO()
+        write_python_analysis(
+            block, file_analysis.get(file_path, {}), incoming_calls.get(file_path, {})
+        )
+        analysis_blocks[file_path] = block.getvalue()
+    entries = []
+    for file_path, relative_path in all_files:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        if max_file_size:
+            size = min(size, max_file_size)
+        overhead = len(relative_path) + len(analysis_blocks.get(file_path, "")) + 64
+        entries.append(((file_path, relative_path), size + overhead))
+    plan = plan_shards(entries, shards, shard_size)
+
+    shard_paths = [shard_file_name(output_file, i + 1) for i in range(len(plan))]
+    # Errors from the analysis go into the first shard.
+    shard_errors = [error_logs] + [()] * (len(plan) - 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(plan)))) as pool:
+        results = list(
+            pool.map(
+                lambda job: write_overview_shard(*job[:2], analysis_blocks, max_file_size, job[2]),
+                zip(shard_paths, plan, shard_errors),
+            )
+        )
+
+    manifest = {
+        "directory": directory,
+        "shards": [
+            {
+                "file": os.path.basename(shard_path),
+                "bytes": size,
+                "files": [relative_path for _, relative_path in shard_files],
+                "errors": shard_errors,
+            }
+            for shard_path, shard_files, (shard_errors, size) in zip(shard_paths, plan, results)
+        ],
+        "errors": error_logs,
+    }
+    manifest_path = f"{os.path.splitext(output_file)[0]}_manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    remove_stale_shards(output_file, shard_paths)
+    return call_graph
+
+
+def combine_files_from_list(
+    file_list, output_file, workers=None, cache=None, max_file_size=None
+):
     """
     Combine specified files (with enriched contextual
     analysis for Python files) into a single output file.
     Errors encountered during processing are collected and reported.
+    Returns the CallGraph of the Python files.
     """
     error_logs = []
     python_files = [file for file in file_list if file.endswith(".py")]
-    file_analysis = {}
-    for file in python_files:
-        file_analysis[file] = analyze_python_file(file, error_logs)
+    file_analysis = analyze_python_files(python_files, error_logs, workers, cache)
 
-    incoming_calls = (
-        perform_cross_file_analysis(python_files, file_analysis, error_logs) if python_files else {}
-    )
+    call_graph = CallGraph(python_files, file_analysis)
+    incoming_calls = call_graph.incoming_calls()
 
-    with open(output_file, "w", encoding="utf-8") as outfile:
+    with open(output_file, "w", encoding="utf-8", buffering=output_buffer_size) as outfile:
         for file_path in file_list:
             if not os.path.exists(file_path):
                 msg = f"File not found: {file_path}"
@@ -373,54 +1202,53 @@ def combine_files_from_list(file_list, output_file):
                     outfile.write("\n")
                 else:
                     outfile.write("\nNo incoming calls from other files detected.\n\n")
-            try:
-                with open(file_path, "r", encoding="utf-8") as infile:
-                    outfile.write("\n--- File Content Start ---\n")
-                    outfile.write(infile.read())
-                    outfile.write("\n--- File Content End ---\n")
-            except Exception as e:
-                msg = f"Could not read {file_path}: {e}"
-                print(msg)
-                error_logs.append(msg)
+            write_file_content(outfile, file_path, error_logs, max_file_size)
         if error_logs:
             outfile.write("\n### Errors Encountered ###\n")
             for error in error_logs:
                 outfile.write(error + "\n")
+    return call_graph
 
 
-def zip_files_in_directory_with_context(directory, output_zip):
+def zip_files_in_directory_with_context(
+    directory,
+    output_zip,
+    workers=None,
+    cache=None,
+    max_file_size=None,
+    compression_level=default_compression_level,
+):
     """
     Zips all files in the directory recursively (applying the same filters) and
     includes a contextual overview file (with errors) in the archive.
+    The tree is walked once and the overview is streamed straight into its entry;
+    already-compressed file types are stored rather than deflated.
+    Returns the CallGraph of the Python files.
     """
     overview_file = "Project_Overview.txt"
-    combine_files_in_directory(directory, overview_file)
-
-    with zipfile.ZipFile(output_zip, "w", zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(overview_file, os.path.basename(overview_file))
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [
-                d
-                for d in dirs
-                if not d.startswith("__") and not d.startswith(".") and d not in exclude_dirs
-            ]
-            for file in files:
-                if (
-                    file.startswith(".")
-                    or file in exclude_files
-                    or file.endswith(".txt")
-                    or file.endswith(".zip")
-                    or file.endswith(".svg")
-                    or file.endswith(".png")
-                ):
-                    continue
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, directory)
-                zipf.write(file_path, arcname)
-    try:
-        os.remove(overview_file)
-    except Exception as e:
-        print(f"Could not remove temporary overview file: {e}")
+    all_files = list_directory_files(directory)
+    error_logs = []
+
+    with zipfile.ZipFile(
+        output_zip, "w", zipfile.ZIP_DEFLATED, compresslevel=compression_level
+    ) as zipf:
+        # Opened by name, so the entry gets the archive's compression and level.
+        with zipf.open(overview_file, "w", force_zip64=True) as entry, io.TextIOWrapper(
+            io.BufferedWriter(entry, output_buffer_size), encoding="utf-8"
+        ) as outfile:
+            call_graph = write_directory_overview(
+                outfile, all_files, error_logs, workers, cache, max_file_size
+            )
+
+        for file_path, arcname in all_files:
+            if file_path.endswith(zip_skip_extensions):
+                continue
+            extension = os.path.splitext(file_path)[1].lower()
+            compress_type = (
+                zipfile.ZIP_STORED if extension in zip_stored_extensions else zipfile.ZIP_DEFLATED
+            )
+            zipf.write(file_path, arcname, compress_type=compress_type)
+    return call_graph
 
 
 # --- Main Program and Argument Parsing ---
@@ -436,37 +1264,122 @@ def main():
     parser.add_argument(
         "paths", nargs="*", help="Files to combine or a single directory to process."
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=default_workers,
+        help="Processes used to analyze Python files (1 = analyze serially).",
+    )
+    parser.add_argument(
+        "--cache",
+        default=default_cache_file,
+        help="Analysis cache file; unchanged Python files are not re-analyzed.",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=default_max_file_size,
+        help="Copy at most this many characters of each file into the overview (0 = no limit).",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(10),
+        default=default_compression_level,
+        metavar="0-9",
+        help="Deflate level for --zip (0 = fastest, 9 = smallest).",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Split the overview of a directory into at most this many files, plus a manifest.",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        help="Split the overview of a directory into files of about this many characters.",
+    )
+    parser.add_argument(
+        "--shard-tokens",
+        type=int,
+        help=f"Like --shard-size, as a token budget (about {chars_per_token} characters per token).",
+    )
+    parser.add_argument(
+        "--call-graph",
+        metavar="PATH",
+        help="Also write the cross-file call graph of the Python files to PATH as JSON.",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Analyze every Python file and leave the cache untouched."
+    )
     args = parser.parse_args()
-
-    if args.zip:
-        if args.paths:
-            directory = args.paths[0]
-            if not os.path.isdir(directory):
-                print(f"Error: {directory} is not a valid directory.")
-                sys.exit(1)
-        else:
-            directory = input("Enter the directory to zip: ").strip()
-            if not os.path.isdir(directory):
-                print(f"Error: {directory} is not a valid directory.")
-                sys.exit(1)
-        output_zip = "Project_Files.zip"
-        zip_files_in_directory_with_context(directory, output_zip)
-        print(f"All files have been zipped into {output_zip}.")
-    else:
-        output_file = "Project_Overview.txt"
-        if args.paths:
-            if len(args.paths) == 1 and os.path.isdir(args.paths[0]):
+    shard_size = args.shard_size or (args.shard_tokens or 0) * chars_per_token
+    sharded = bool(args.shards or shard_size)
+    if sharded and (args.zip or len(args.paths) > 1):
+        parser.error("--shards, --shard-size and --shard-tokens only apply to a single directory")
+    cache = None if args.no_cache else open_cache(args.cache)
+    try:
+        if args.zip:
+            if args.paths:
                 directory = args.paths[0]
-                combine_files_in_directory(directory, output_file)
+                if not os.path.isdir(directory):
+                    print(f"Error: {directory} is not a valid directory.")
+                    sys.exit(1)
             else:
-                combine_files_from_list(args.paths, output_file)
+                directory = input("Enter the directory to zip: ").strip()
+                if not os.path.isdir(directory):
+                    print(f"Error: {directory} is not a valid directory.")
+                    sys.exit(1)
+            output_zip = "Project_Files.zip"
+            call_graph = zip_files_in_directory_with_context(
+                directory,
+                output_zip,
+                args.workers,
+                cache,
+                args.max_file_size,
+                args.compression_level,
+            )
+            print(f"All files have been zipped into {output_zip}.")
         else:
-            directory = input("Enter the directory to combine files from: ").strip()
-            if not os.path.isdir(directory):
-                print(f"Error: {directory} is not a valid directory.")
-                sys.exit(1)
-            combine_files_in_directory(directory, output_file)
-        print(f"All files have been combined into {output_file}.")
+            output_file = "Project_Overview.txt"
+            if args.paths and not (len(args.paths) == 1 and os.path.isdir(args.paths[0])):
+                if sharded:
+                    parser.error("--shards, --shard-size and --shard-tokens only apply to a directory")
+                call_graph = combine_files_from_list(
+                    args.paths, output_file, args.workers, cache, args.max_file_size
+                )
+            else:
+                if args.paths:
+                    directory = args.paths[0]
+                else:
+                    directory = input("Enter the directory to combine files from: ").strip()
+                    if not os.path.isdir(directory):
+                        print(f"Error: {directory} is not a valid directory.")
+                        sys.exit(1)
+                if sharded:
+                    call_graph = combine_files_in_directory_sharded(
+                        directory,
+                        output_file,
+                        args.shards,
+                        shard_size,
+                        args.workers,
+                        cache,
+                        args.max_file_size,
+                    )
+                    output_file = f"{os.path.splitext(output_file)[0]}_manifest.json"
+                    print(f"All files have been combined into the shards listed in {output_file}.")
+                else:
+                    call_graph = combine_files_in_directory(
+                        directory, output_file, args.workers, cache, args.max_file_size
+                    )
+            if not sharded:
+                print(f"All files have been combined into {output_file}.")
+        if args.call_graph:
+            call_graph.save(args.call_graph)
+            print(f"Call graph written to {args.call_graph}.")
+    finally:
+        if cache:
+            cache.close()
 
 
 if __name__ == "__main__":
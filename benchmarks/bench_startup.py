@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "build_ai_index.py")
+
+# Modules that only the summarize and embed stages should pull in.
+HEAVY_MODULES = ["openai", "langchain", "langchain_core", "langchain_community", "faiss", "dotenv"]
+
+IMPORT_CHECK = (
+    "import sys, time; start = time.perf_counter(); import build_ai_index; "
+    "print(time.perf_counter() - start); "
+    f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+
+def run(cmd, cwd, env):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stdout + result.stderr)
+        sys.exit(result.returncode)
+    return elapsed, result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and scan-only startup of build_ai_index.py")
+    parser.add_argument("--src", "-s", default=ROOT, help="Tree to scan")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # No key and no sitecustomize shims: the scan-only path must work offline.
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "PYTHONPATH")}
+    env["PYTHONPATH"] = ROOT
+
+    imports, loaded = [], ""
+    for _ in range(args.runs):
+        _, out = run([sys.executable, "-c", IMPORT_CHECK], ROOT, env)
+        seconds, loaded = out.splitlines()[0], (out.splitlines() + [""])[1]
+        imports.append(float(seconds))
+    print(f"⏱️ import build_ai_index: median {statistics.median(imports) * 1000:.1f} ms, "
+          f"min {min(imports) * 1000:.1f} ms")
+    print(f"📦 heavy modules loaded at import: {loaded or 'none'}")
+
+    with tempfile.TemporaryDirectory() as work:
+        for stage in ("scan", "tag"):
+            times = []
+            for _ in range(args.runs):
+                elapsed, _ = run([sys.executable, SCRIPT, "--src", os.path.abspath(args.src),
+                                  "--stage", stage, "--embedder", "hash"], work, env)
+                times.append(elapsed)
+            print(f"⏱️ --stage {stage} (process wall time): median {statistics.median(times) * 1000:.1f} ms, "
+                  f"min {min(times) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
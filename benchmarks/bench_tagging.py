@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_ai_index import TAG_RULES, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS, RuleMatcher
+
+WORDS = ["data", "value", "result", "handler", "config", "item", "request", "state", "props", "index"]
+
+
+# The per-entry loops the tag stage used before the rule matcher, kept as the baseline.
+def legacy_classify(entry):
+    tags = set(entry.get("tags", []))
+    content = (entry.get("excerpt", "") + entry.get("name", "")).lower()
+    for key, tag in TAG_RULES.items():
+        if key in content:
+            tags.add(tag)
+    excerpt = entry.get("excerpt", "").lower()
+    frameworks = []
+    if "react" in excerpt or entry["name"].endswith(".tsx"):
+        frameworks.append("React")
+    if "vite" in excerpt:
+        frameworks.append("Vite")
+    if "@radix-ui" in excerpt:
+        frameworks.append("Radix UI")
+    if "tailwind" in excerpt:
+        frameworks.append("Tailwind")
+    return sorted(tags), frameworks
+
+
+def matcher_classify(matcher, entry):
+    tags, frameworks = matcher.classify(entry.get("excerpt", ""), entry.get("name", ""))
+    return sorted(tags.union(entry.get("tags", []))), frameworks
+
+
+def make_entries(count, excerpt_chars, seed=0):
+    rng = random.Random(seed)
+    keywords = list(TAG_RULES) + list(FRAMEWORK_RULES)
+    entries = []
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(excerpt_chars // 6)]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        name = f"item_{i}" + rng.choice(["", ".py", ".tsx", ".ts"])
+        entries.append({"name": name, "excerpt": " ".join(words)[:excerpt_chars]})
+    return entries
+
+
+def extra_rules(count):
+    # Synthetic user rules, to see how each approach scales with the rule count.
+    return {f"keyword{i}": f"#extra{i}" for i in range(count)}
+
+
+def time_per_entry(fn, entries, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for entry in entries:
+            fn(entry)
+        best = min(best, time.perf_counter() - start)
+    return best / len(entries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark tag and framework detection")
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--excerpt-chars", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    entries = make_entries(args.entries, args.excerpt_chars)
+    matcher = RuleMatcher(TAG_RULES, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS)
+    for entry in entries:
+        assert legacy_classify(entry) == matcher_classify(matcher, entry), entry["name"]
+
+    print(f"🔎 matcher backend: {matcher.backend}")
+    legacy = time_per_entry(legacy_classify, entries, args.rounds)
+    compiled = time_per_entry(lambda entry: matcher_classify(matcher, entry), entries, args.rounds)
+    print(f"⏱️ {len(TAG_RULES)} tag rules: legacy {legacy:.2f} µs/entry, "
+          f"matcher {compiled:.2f} µs/entry ({legacy / compiled:.2f}x)")
+
+    # Larger rule sets, as loaded with --rules: one loop per rule vs one pass over distinct keywords.
+    for count in (100, 400):
+        rules = dict(TAG_RULES, **extra_rules(count))
+        matcher = RuleMatcher(rules, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS)
+
+        def loop_tags(entry, rules=rules):
+            content = (entry["excerpt"] + entry["name"]).lower()
+            return {tag for key, tag in rules.items() if key in content}
+
+        legacy = time_per_entry(loop_tags, entries, args.rounds)
+        compiled = time_per_entry(lambda entry: matcher_classify(matcher, entry), entries, args.rounds)
+        print(f"⏱️ {len(rules)} tag rules: tags-only loop {legacy:.2f} µs/entry, "
+              f"matcher tags+frameworks {compiled:.2f} µs/entry ({legacy / compiled:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
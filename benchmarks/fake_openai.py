@@ -0,0 +1,81 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Local stand-in for the chat completions and embeddings endpoints. Replies
+# are deterministic, every request sleeps latency_ms first, and requests are
+# counted per endpoint. Point OPENAI_BASE_URL at .url.
+class FakeOpenAI:
+    def __init__(self, latency_ms=0.0, dim=256, host="127.0.0.1", port=0):
+        self.latency = latency_ms / 1000.0
+        self.dim = dim
+        self.calls = {"chat": 0, "embeddings": 0}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}/v1"
+        self.thread = None
+
+    def chat(self, body):
+        content = body["messages"][-1]["content"]
+        ids = re.findall(r'"id": (\d+)', content)
+        if ids:
+            text = json.dumps({"summaries": [{"id": int(i), "summary": f"Summary of excerpt {i}."} for i in ids]})
+        else:
+            text = "Summary " + hashlib.md5(content.encode("utf-8")).hexdigest()[:8] + "."
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(content) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(content) + len(text)) // 4},
+        }
+
+    def embeddings(self, body):
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, item in enumerate(inputs):
+            seed = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+            data.append({"object": "embedding", "index": i,
+                         "embedding": [seed[j % 32] / 255.0 for j in range(self.dim)]})
+        return {"object": "list", "data": data, "model": body["model"],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                kind = "chat" if self.path.endswith("/chat/completions") else "embeddings"
+                if not self.path.endswith(("/chat/completions", "/embeddings")):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if fake.latency:
+                    time.sleep(fake.latency)
+                with fake.lock:
+                    fake.calls[kind] += 1
+                payload = json.dumps(fake.chat(body) if kind == "chat" else fake.embeddings(body)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,260 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Programming"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_repo import generate_repo
+from fake_openai import FakeOpenAI
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TASKS = ["scan", "index_no_llm", "index_full", "index_noop", "analyze", "overview",
+         "overview_cached", "overview_simple", "zip", "unpack"]
+# Named tree shapes; any of them can be overridden from the command line.
+PRESETS = {
+    "small": dict(files=200, size=3000, depth=3, python_ratio=0.6, duplicates=0.1),
+    "medium": dict(files=1000, size=4000, depth=4, python_ratio=0.6, duplicates=0.15),
+    "large": dict(files=5000, size=5000, depth=5, python_ratio=0.5, duplicates=0.2),
+    "deep": dict(files=1000, size=2000, depth=8, python_ratio=0.6, duplicates=0.1, fanout=2),
+    "non_python": dict(files=1000, size=4000, depth=3, python_ratio=0.1, duplicates=0.1),
+}
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def cwd(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def git_revision():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                      stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return sha, dirty
+
+
+def python_files(src):
+    return sorted(os.path.join(root, f) for root, _, files in os.walk(src) for f in files if f.endswith(".py"))
+
+
+# Each task takes (src, work) and runs with work as the current directory.
+# setup() runs untimed before every repeat.
+def task_scan(src, work):
+    import build_ai_index
+    build_ai_index.build_ai_index(src, "faiss_index", full=True, stage="scan", metrics_file="")
+
+
+def task_index(stage):
+    def run(src, work):
+        import build_ai_index
+        build_ai_index.build_ai_index(src, "faiss_index", full=True, stage=stage, embedder="hash",
+                                      summary_cache="", embedding_cache="", metrics_file="metrics.json")
+    return run
+
+
+def task_index_noop(src, work):
+    import build_ai_index
+    build_ai_index.build_ai_index(src, "faiss_index", embedder="hash", summary_cache="",
+                                  embedding_cache="", metrics_file="")
+
+
+def setup_index_noop(src, work):
+    task_index("embed")(src, work)
+
+
+def task_analyze(src, work):
+    import create_overview
+    errors = []
+    files = python_files(src)
+    analysis = {path: create_overview.analyze_python_file(path, errors) for path in files}
+    create_overview.perform_cross_file_analysis(files, analysis, errors)
+
+
+def task_overview(src, work):
+    import create_overview
+    create_overview.combine_files_in_directory(src, "Project_Overview.txt")
+
+
+# Second run against a warm analysis cache in the work directory.
+def task_overview_cached(src, work):
+    import create_overview
+    cache = create_overview.AnalysisCache(os.path.join(work, "analysis_cache.sqlite"))
+    try:
+        create_overview.combine_files_in_directory(src, "Project_Overview.txt", cache=cache)
+    finally:
+        cache.close()
+
+
+def task_overview_simple(src, work):
+    import createOverview
+    createOverview.combine_files_in_directory(src, "Project_Overview.txt")
+
+
+def task_zip(src, work):
+    import create_overview
+    create_overview.zip_files_in_directory_with_context(src, "Project_Files.zip")
+
+
+def setup_unpack(src, work):
+    task_overview_simple(src, work)
+    shutil.rmtree(os.path.join(work, "unpacked"), ignore_errors=True)
+    os.makedirs(os.path.join(work, "unpacked"))
+    shutil.copy(os.path.join(work, "Project_Overview.txt"), os.path.join(work, "unpacked"))
+
+
+def task_unpack(src, work):
+    # unpackOverview.py unpacks ./Project_Overview.txt into . as soon as it runs.
+    subprocess.run([sys.executable, os.path.join(ROOT, "unpackOverview.py")],
+                   cwd=os.path.join(work, "unpacked"), check=True, stdout=subprocess.DEVNULL)
+
+
+TASK_FUNCS = {
+    "scan": (None, task_scan),
+    "index_no_llm": (None, task_index("tag")),
+    "index_full": (None, task_index("embed")),
+    "index_noop": (setup_index_noop, task_index_noop),
+    "analyze": (None, task_analyze),
+    "overview": (None, task_overview),
+    "overview_cached": (task_overview_cached, task_overview_cached),
+    "overview_simple": (None, task_overview_simple),
+    "zip": (None, task_zip),
+    "unpack": (setup_unpack, task_unpack),
+}
+
+
+def run_task(name, src, repeat):
+    setup, fn = TASK_FUNCS[name]
+    times, outputs = [], {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as work, cwd(work), quiet():
+            if setup:
+                setup(src, work)
+            start = time.perf_counter()
+            fn(src, work)
+            times.append(time.perf_counter() - start)
+            for output in ("Project_Overview.txt", "Project_Files.zip", "master_index_enhanced.jsonl"):
+                if os.path.exists(output):
+                    outputs[output] = os.path.getsize(output)
+            if os.path.exists("metrics.json"):
+                with open("metrics.json", "r", encoding="utf-8") as f:
+                    outputs["build_metrics"] = json.load(f)
+    result = {"median_s": round(statistics.median(times), 6), "min_s": round(min(times), 6),
+              "runs_s": [round(t, 6) for t in times]}
+    if outputs:
+        result["outputs"] = outputs
+    return result
+
+
+# Heavy modules are imported once up front, so the first repeat of a task
+# does not pay for them and forked parse workers inherit them.
+def warm_imports():
+    import build_ai_index
+    import create_overview
+    import createOverview
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores import FAISS
+    from openai import OpenAI
+
+
+def run_benchmarks(config, tasks, repeat, latency_ms, git):
+    warm_imports()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-src-") as src, FakeOpenAI(latency_ms) as fake:
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["OPENAI_BASE_URL"] = fake.url
+        tree = generate_repo(src, git=git, **config)
+        for name in tasks:
+            print(f"⏱️ {name} ...", end=" ", flush=True)
+            results[name] = run_task(name, src, repeat)
+            print(f"median {results[name]['median_s'] * 1000:.1f} ms")
+        calls = dict(fake.calls)
+    return tree, results, calls
+
+
+def compare(previous, current):
+    print(f"\n📊 {previous['commit']} -> {current['commit']}")
+    for name, result in current["results"].items():
+        old = previous["results"].get(name)
+        if not old:
+            continue
+        ratio = result["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        print(f"  {name:16} {old['median_s'] * 1000:10.1f} ms -> {result['median_s'] * 1000:10.1f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the indexing and overview tools on a synthetic tree")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--files", type=int)
+    parser.add_argument("--size", type=int, help="Median file size in bytes")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--fanout", type=int)
+    parser.add_argument("--python-ratio", type=float)
+    parser.add_argument("--duplicates", type=float, help="Fraction of vendored duplicate files")
+    parser.add_argument("--binary-ratio", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-git", action="store_true", help="Do not commit the synthetic tree to git")
+    parser.add_argument("--tasks", default=",".join(TASKS), help=f"Comma-separated subset of {','.join(TASKS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency of every fake API call")
+    parser.add_argument("--output", help="Result file (default: results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    tasks = [name.strip() for name in args.tasks.split(",") if name.strip()]
+    unknown = [name for name in tasks if name not in TASK_FUNCS]
+    if unknown:
+        parser.error(f"unknown tasks: {', '.join(unknown)}")
+    config = dict(PRESETS[args.preset], seed=args.seed)
+    for key in ("files", "size", "depth", "fanout", "python_ratio", "duplicates", "binary_ratio"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    commit, dirty = git_revision()
+    print(f"🧪 {args.preset} tree {config} at {commit}{' (dirty)' if dirty else ''}")
+    tree, results, calls = run_benchmarks(config, tasks, args.repeat, args.latency_ms, not args.no_git)
+    report = {
+        "commit": commit, "dirty": dirty, "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "preset": args.preset, "config": config, "tree": tree, "repeat": args.repeat,
+        "latency_ms": args.latency_ms, "fake_api_calls": calls, "results": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.preset}-{commit}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Saved results to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import random
+import argparse
+import subprocess
+
+# Vocabulary chosen so the tag rules in build_ai_index.py fire on some files.
+WORDS = [
+    "user", "login", "auth", "token", "session", "cache", "query", "schema", "table", "route",
+    "handler", "request", "response", "config", "task", "queue", "event", "notification", "render",
+    "component", "state", "props", "upload", "file", "report", "metric", "payload", "record",
+]
+NON_PYTHON_KINDS = [".md", ".ts", ".tsx", ".js", ".toml", ".json"]
+VENDOR_DIRS = ["vendor", "node_modules", "third_party"]
+
+
+def ident(rng, parts=2):
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+
+def sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def python_module(rng, size, module, siblings):
+    # Functions call into sibling modules so the cross-file analysis has edges to
+    # find; each module's first function is the one its siblings import.
+    imports = rng.sample(siblings, min(len(siblings), rng.randint(0, 3)))
+    lines = [f'"""{sentence(rng)}"""', "import os", "import json"]
+    lines.extend(f"from {name} import {func}" for name, func in imports)
+    lines.append("")
+    n = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        n += 1
+        if n % 4 == 0:
+            cls = ident(rng, 2).title().replace("_", "") + str(n)
+            lines += ["", f"class {cls}:", f'    """{sentence(rng)}"""', ""]
+            for m in range(rng.randint(1, 3)):
+                lines += [f"    def {ident(rng)}_{m}(self, {ident(rng, 1)}: str) -> dict:",
+                          f'        """{sentence(rng)}"""',
+                          f"        return {{'{ident(rng, 1)}': {ident(rng, 1)!r}}}", ""]
+            continue
+        name = f"{module}_main" if n == 1 else f"{module}_{ident(rng)}_{n}"
+        lines += ["", f"def {name}({ident(rng, 1)}, {ident(rng, 1)}_id: int = 0):",
+                  f'    """{sentence(rng)}"""', f"    data = {{'{ident(rng, 1)}': {n}}}"]
+        if imports and rng.random() < 0.6:
+            lines.append(f"    data['x'] = {rng.choice(imports)[1]}(data)")
+        lines += ["    path = os.path.join('data', json.dumps(data))", "    return path", ""]
+    return "\n".join(lines) + "\n"
+
+
+def text_file(rng, size, ext, name):
+    if ext == ".md":
+        lines = [f"# {name}", ""]
+        while sum(len(line) + 1 for line in lines) < size:
+            lines += [f"## {ident(rng).replace('_', ' ').title()}", "", sentence(rng, 20), ""]
+    elif ext in (".ts", ".tsx", ".js"):
+        lines = ["import React from 'react';", ""] if ext == ".tsx" else []
+        n = 0
+        while sum(len(line) + 1 for line in lines) < size:
+            n += 1
+            lines += [f"export function {ident(rng)}{n}({ident(rng, 1)}) {{",
+                      f"  // {sentence(rng)}", f"  return {{ {ident(rng, 1)}: {n} }};", "}", ""]
+    elif ext == ".toml":
+        lines = [f"[{name}]"]
+        while sum(len(line) + 1 for line in lines) < size:
+            lines.append(f'{ident(rng)} = "{sentence(rng, 4)}"')
+    else:
+        items = []
+        while sum(len(item) + 2 for item in items) < size:
+            items.append(f'"{ident(rng)}_{len(items)}": "{sentence(rng, 4)}"')
+        lines = ["{", ",\n".join("  " + item for item in items), "}"]
+    return "\n".join(lines) + "\n"
+
+
+def make_dirs(rng, depth, fanout):
+    dirs = [""]
+    frontier = [""]
+    for level in range(depth):
+        nxt = []
+        for parent in frontier:
+            for i in range(fanout):
+                path = os.path.join(parent, f"{ident(rng, 1)}{level}{i}")
+                dirs.append(path)
+                nxt.append(path)
+        frontier = nxt
+    return dirs
+
+
+# Writes a synthetic project under root and returns {"files": n, "bytes": n}.
+# The same arguments and seed always produce the same tree.
+def generate_repo(root, files=200, size=4000, depth=3, python_ratio=0.6, duplicates=0.1,
+                  binary_ratio=0.0, fanout=3, seed=0, git=False):
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    dirs = make_dirs(rng, depth, fanout)
+    originals = max(1, int(files * (1 - duplicates)))
+    modules, written, total = [], [], 0
+
+    for i in range(originals):
+        directory = rng.choice(dirs)
+        file_size = max(200, int(rng.lognormvariate(0, 0.6) * size))
+        roll = rng.random()
+        if roll < binary_ratio:
+            # Already-compressed payloads, e.g. images shipped with the project.
+            name, data = f"asset{i}.png", b"\x89PNG\r\n\x1a\n" + rng.randbytes(file_size)
+        elif roll < binary_ratio + python_ratio:
+            name = f"mod{i}.py"
+            data = python_module(rng, file_size, f"mod{i}", modules[-20:]).encode("utf-8")
+            modules.append((f"mod{i}", f"mod{i}_main"))
+        else:
+            ext = rng.choice(NON_PYTHON_KINDS)
+            name = f"file{i}{ext}"
+            data = text_file(rng, file_size, ext, name).encode("utf-8")
+        path = os.path.join(root, directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append((os.path.join(directory, name), data))
+        total += len(data)
+
+    # Vendored duplicates: byte-identical copies of earlier files under vendor-style trees.
+    for i in range(files - originals):
+        rel_path, data = rng.choice(written)
+        path = os.path.join(root, rng.choice(VENDOR_DIRS), f"pkg{i % 7}", rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        total += len(data)
+
+    if git:
+        env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+                   GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com",
+                   GIT_AUTHOR_DATE="2024-01-01T00:00:00", GIT_COMMITTER_DATE="2024-01-01T00:00:00")
+        for cmd in (["git", "init", "-q"], ["git", "add", "-A"], ["git", "commit", "-q", "-m", "synthetic"]):
+            subprocess.run(cmd, cwd=root, env=env, check=True, stdout=subprocess.DEVNULL)
+    return {"files": files, "bytes": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic project tree for benchmarks")
+    parser.add_argument("root", help="Directory to create")
+    parser.add_argument("--files", type=int, default=200, help="Total number of files")
+    parser.add_argument("--size", type=int, default=4000, help="Median file size in bytes")
+    parser.add_argument("--depth", type=int, default=3, help="Directory nesting depth")
+    parser.add_argument("--fanout", type=int, default=3, help="Subdirectories per directory")
+    parser.add_argument("--python-ratio", type=float, default=0.6, help="Fraction of Python files")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Fraction of vendored duplicate files")
+    parser.add_argument("--binary-ratio", type=float, default=0.0, help="Fraction of binary (.png) files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--git", action="store_true", help="Commit the tree to a new git repository")
+    args = parser.parse_args()
+
+    stats = generate_repo(args.root, args.files, args.size, args.depth, args.python_ratio,
+                          args.duplicates, args.binary_ratio, args.fanout, args.seed, args.git)
+    print(f"📁 Wrote {stats['files']} files ({stats['bytes']} bytes) to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
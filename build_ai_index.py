@@ -5,25 +5,54 @@ import sys
 import ast
 import json
 import argparse
+import contextlib
+import cProfile
+import hashlib
+import math
+import mmap
+import pstats
+import random
 import re
+import shutil
+import sqlite3
+import struct
+import threading
 import time
-from dotenv import load_dotenv
-from openai import OpenAI
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+# Optional (pip install pyahocorasick): tagging then matches every rule keyword
+# in one pass, which pays off with large --rules files. See RuleMatcher.
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
-# Load environment variables from ~/.env
-load_dotenv(dotenv_path=os.path.expanduser("~/.env"))
-
-if not os.getenv("OPENAI_API_KEY") or "your-api-key" in os.getenv("OPENAI_API_KEY"):
-    print("❌ ERROR: OPENAI_API_KEY is missing or placeholder. Set a valid key in your .env file.")
-    sys.exit(1)
+# openai, langchain and FAISS are imported inside the stages that use them, so
+# scan/parse/tag runs (--stage) start fast and work offline.
+STAGES = ["scan", "parse", "tag", "summarize", "embed"]
 
+def require_api_key():
+    # Load environment variables from ~/.env
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=os.path.expanduser("~/.env"))
+    if not os.getenv("OPENAI_API_KEY") or "your-api-key" in os.getenv("OPENAI_API_KEY"):
+        print("❌ ERROR: OPENAI_API_KEY is missing or placeholder. Set a valid key in your .env file.")
+        sys.exit(1)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = None
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import TextLoader
+# Created on first use, so runs whose summaries are all cached or skipped (--no-llm) never
+# need a key for it; with --embedder hash such runs are fully offline.
+# Retries are handled by chat_completion() so they go through the rate limiter.
+# OPENAI_BASE_URL can point this at a local fake chat-completions server.
+def get_client():
+    global client
+    if client is None:
+        require_api_key()
+        from openai import OpenAI
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return client
 
 
 
@@ -34,8 +63,64 @@ ALLOWED_EXTS = {
 }
 SPECIAL_FILES = {'Dockerfile', 'Makefile'}
 EXCLUDE_DIRS = {'node_modules', '.git', '.venv', 'venv', 'uploads'}
-INPUT_FILE = "master_index.json"
-OUTPUT_FILE = "master_index_enhanced.json"
+INPUT_FILE = "master_index.jsonl"
+OUTPUT_FILE = "master_index_enhanced.jsonl"
+TEXT_TABLE_FILE = "master_index_text.sqlite"
+LEXICAL_FILE = "master_index_enhanced.lex"
+BM25_K1 = 1.2
+BM25_B = 0.75
+EXCERPT_CHARS = 500
+MANIFEST_FILE = "index_manifest.json"
+
+# Scan/parse process pool; small scans run in-process to skip the pool start-up cost.
+SCAN_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_FILES = 64
+# Files at least this large are decoded straight from an mmap instead of read().
+MMAP_MIN_BYTES = 1 << 20
+# Python and Markdown are chunked along symbols and headings with no overlap;
+# CHUNK_OVERLAP only applies to the plain character splitter used for the rest.
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+MARKDOWN_HEADING = re.compile(r"#{1,6}\s")
+
+# Summarization concurrency and rate limits
+SUMMARY_MODEL = "gpt-4"
+SUMMARY_MAX_TOKENS = 80
+SUMMARY_WORKERS = 8
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 90000
+MAX_RETRIES = 5
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+# Bump SUMMARY_PROMPT_VERSION whenever SUMMARY_PROMPT changes so cached summaries are not reused.
+SUMMARY_PROMPT_VERSION = 1
+SUMMARY_PROMPT = """Summarize the following code excerpt in one natural sentence suitable for developers reviewing a project structure. Be specific about what the file or function does.
+
+Excerpt:
+{excerpt}
+"""
+SUMMARY_BATCH_PROMPT = """Summarize each of the following code excerpts in one natural sentence suitable for developers reviewing a project structure. Be specific about what each file or function does.
+
+Respond with JSON only, in the form {{"summaries": [{{"id": <id>, "summary": "<sentence>"}}]}}, with exactly one item per excerpt id.
+
+Excerpts (one JSON object per line):
+{excerpts}
+"""
+# Prompt-token budget per batched request; 0 sends one request per excerpt.
+SUMMARY_BATCH_TOKENS = 3000
+SUMMARY_BATCH_MAX = 16
+SUMMARY_CACHE_FILE = "summary_cache.sqlite"
+SUMMARY_CACHE_MAX_ENTRIES = 200000
+
+# Embedding backends: "openai" or the offline, deterministic "hash" embedder.
+EMBEDDER = "openai"
+EMBED_BATCH_SIZE = 256
+EMBEDDING_CACHE_DIR = "embedding_cache"
+HASH_EMBEDDING_DIM = 512
+
+METRICS_FILE = "build_metrics.json"
+# Upper bounds (ms) of the API latency histogram buckets; slower calls land in "inf".
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
 
 # Tag rules
 TAG_RULES = {
@@ -59,24 +144,107 @@ TAG_RULES = {
     "notification": "#notification",
 }
 
-master_index = []
+# Framework rules: keywords looked for in an entry's excerpt, plus file extensions.
+FRAMEWORK_RULES = {
+    "react": "React",
+    "vite": "Vite",
+    "@radix-ui": "Radix UI",
+    "tailwind": "Tailwind",
+}
+FRAMEWORK_EXTENSIONS = {".tsx": "React"}
+
+class RuleMatcher:
+    # Compiled once from the tag and framework rules, so tagging and framework
+    # detection share a single pass per entry and a keyword used by several
+    # rules is only looked for once. With pyahocorasick installed the keywords
+    # become one automaton and the cost no longer grows with the rule count;
+    # otherwise each distinct keyword is a substring test (CPython's re has no
+    # multi-literal optimisation and a keyword alternation measured 2-4x slower).
+    def __init__(self, tag_rules, framework_rules, framework_extensions):
+        rules = {}
+        for keyword, tag in tag_rules.items():
+            rules.setdefault(keyword.lower(), ([], []))[0].append(tag)
+        for keyword, framework in framework_rules.items():
+            rules.setdefault(keyword.lower(), ([], []))[1].append(framework)
+        self.rules = tuple((keyword, tuple(tags), tuple(frameworks))
+                           for keyword, (tags, frameworks) in rules.items())
+        self.extensions = tuple(framework_extensions.items())
+        self.suffixes = tuple(framework_extensions)
+        self.frameworks = list(dict.fromkeys(list(framework_rules.values()) + list(framework_extensions.values())))
+        self.automaton = None
+        if ahocorasick is not None and self.rules and all(rule[0] for rule in self.rules):
+            self.automaton = ahocorasick.Automaton()
+            for i, rule in enumerate(self.rules):
+                self.automaton.add_word(rule[0], i)
+            self.automaton.make_automaton()
+        self.backend = "aho-corasick" if self.automaton is not None else "substring"
+
+    # Maps each matching rule index to whether it also occurs within the first `cut` chars.
+    def matches(self, text, cut):
+        if self.automaton is not None:
+            found = {}
+            for end, i in self.automaton.iter(text):
+                found[i] = found.get(i, False) or end < cut
+            return found
+        head = text[:cut]
+        return {i: rule[0] in head for i, rule in enumerate(self.rules) if rule[0] in text}
+
+    def tags(self, text):
+        lower = text.lower()
+        return {tag for i in self.matches(lower, 0) for tag in self.rules[i][1]}
+
+    def classify(self, excerpt, name):
+        excerpt = excerpt.lower()
+        tags, frameworks = set(), set()
+        for i, in_excerpt in self.matches(excerpt + name.lower(), len(excerpt)).items():
+            _, keyword_tags, keyword_frameworks = self.rules[i]
+            tags.update(keyword_tags)
+            # Frameworks only count when the keyword is in the excerpt itself.
+            if keyword_frameworks and in_excerpt:
+                frameworks.update(keyword_frameworks)
+        if name.endswith(self.suffixes):
+            frameworks.update(f for suffix, f in self.extensions if name.endswith(suffix))
+        if not frameworks:
+            return tags, []
+        return tags, [f for f in self.frameworks if f in frameworks]
+
+MATCHER = RuleMatcher(TAG_RULES, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS)
+
+# Also the process-pool initializer, so workers see rules loaded from --rules.
+def configure_rules(tag_rules, framework_rules, framework_extensions):
+    global MATCHER
+    tag_rules, framework_rules, framework_extensions = dict(tag_rules), dict(framework_rules), dict(framework_extensions)
+    TAG_RULES.clear()
+    TAG_RULES.update(tag_rules)
+    FRAMEWORK_RULES.clear()
+    FRAMEWORK_RULES.update(framework_rules)
+    FRAMEWORK_EXTENSIONS.clear()
+    FRAMEWORK_EXTENSIONS.update(framework_extensions)
+    MATCHER = RuleMatcher(TAG_RULES, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS)
+
+# A rules file is JSON with optional "tags", "frameworks" and
+# "framework_extensions" objects, merged over the built-in rules.
+def load_rules(path):
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    configure_rules(dict(TAG_RULES, **rules.get("tags", {})),
+                    dict(FRAMEWORK_RULES, **rules.get("frameworks", {})),
+                    dict(FRAMEWORK_EXTENSIONS, **rules.get("framework_extensions", {})))
 
 def extract_tags_and_summary(name, docstring):
     tags = set()
     summary = ""
     if docstring:
         summary = docstring.strip().split("\n")[0]
-        lower = docstring.lower()
-        for keyword, tag in TAG_RULES.items():
-            if keyword in lower:
-                tags.add(tag)
-    return list(tags), summary
+        tags = MATCHER.tags(docstring)
+    return sorted(tags), summary
 
-def parse_python_file_ast(path, source, rel_path):
-    try:
-        tree = ast.parse(source, filename=rel_path)
-    except Exception:
-        return []
+def parse_python_file_ast(path, source, rel_path, tree=None):
+    if tree is None:
+        try:
+            tree = ast.parse(source, filename=rel_path)
+        except Exception:
+            return []
 
     components = []
     tags, summary = extract_tags_and_summary(os.path.basename(rel_path), ast.get_docstring(tree))
@@ -87,78 +255,705 @@ def parse_python_file_ast(path, source, rel_path):
         "lineno": 1,
         "tags": tags,
         "summary": summary,
-        "excerpt": source[:500]
+        "excerpt": source[:EXCERPT_CHARS]
     })
 
+    lines = source.splitlines(keepends=True)
     for node in ast.walk(tree):
         if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
             tags, summary = extract_tags_and_summary(node.name, ast.get_docstring(node))
+            # Each symbol is excerpted from its own span, decorators included.
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            end = getattr(node, "end_lineno", None) or node.lineno
             components.append({
                 "type": "class" if isinstance(node, ast.ClassDef) else "function",
                 "name": node.name,
                 "path": rel_path,
                 "lineno": node.lineno,
+                "end_lineno": end,
                 "tags": tags,
                 "summary": summary,
-                "excerpt": source[:500]
+                "excerpt": "".join(lines[start - 1:end])[:EXCERPT_CHARS]
             })
 
     return components
 
-def load_documents_and_index(src_dir: str):
-    docs = []
+def is_source_name(fname):
+    return fname in SPECIAL_FILES or os.path.splitext(fname)[1].lower() in ALLOWED_EXTS
+
+def iter_source_files(src_dir):
     for root, dirs, files in os.walk(src_dir):
         dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
         for fname in files:
-            ext = os.path.splitext(fname)[1].lower()
-            if fname in SPECIAL_FILES or ext in ALLOWED_EXTS:
+            if is_source_name(fname):
                 path = os.path.join(root, fname)
-                rel_path = os.path.relpath(path, src_dir)
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        source = f.read()
-                        excerpt = source[:500]
-                        if ext == ".py":
-                            components = parse_python_file_ast(path, source, rel_path)
-                            master_index.extend(components)
-                        else:
-                            master_index.append({
-                                "type": "file",
-                                "name": fname,
-                                "path": rel_path,
-                                "lineno": 1,
-                                "tags": [],
-                                "summary": "",
-                                "excerpt": excerpt
-                            })
-                except Exception as e:
-                    print(f"⚠️ Failed to parse {rel_path}: {e}")
-                try:
-                    docs.extend(TextLoader(path, encoding='utf-8').load())
-                except Exception as e:
-                    print(f"⚠️ Failed to load for embedding: {path}: {e}")
-    return docs
+                yield path, os.path.relpath(path, src_dir)
+
+# Whether iter_source_files() would yield rel_path.
+def is_source_file(rel_path):
+    parts = os.path.normpath(rel_path).split(os.sep)
+    return parts[0] != ".." and is_source_name(parts[-1]) and not EXCLUDE_DIRS.intersection(parts[:-1])
+
+def read_source(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_MIN_BYTES:
+            return f.read().decode("utf-8")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, "utf-8")
+
+# --- Syntax-aware chunking ---
+# A unit is a (start_line, end_line, symbol) span. Units are packed into
+# chunks of at most CHUNK_SIZE characters without ever splitting one, unless
+# a single unit is larger than the budget on its own.
+def python_units(tree, lines, budget):
+    units = []
+
+    # Statements without a name of their own are attributed to the enclosing symbol.
+    def visit(nodes, prefix, parent):
+        for node in nodes:
+            start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+            end = getattr(node, "end_lineno", None) or node.lineno
+            name = f"{prefix}{node.name}" if hasattr(node, "name") else parent
+            body = getattr(node, "body", None)
+            is_def = isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+            # Oversized classes and functions are broken up along their own statements.
+            if is_def and body and len("".join(lines[start - 1:end])) > budget:
+                body_start = min([body[0].lineno] + [d.lineno for d in getattr(body[0], "decorator_list", [])])
+                if body_start > start:
+                    units.append((start, body_start - 1, name))
+                visit(body, f"{name}.", name)
+            else:
+                units.append((start, end, name))
+
+    visit(tree.body, "", None)
+    return units
+
+def markdown_units(lines):
+    units, start, heading, fenced = [], 1, None, False
+    for i, line in enumerate(lines, 1):
+        if line.lstrip().startswith(("```", "~~~")):
+            fenced = not fenced
+        elif not fenced and MARKDOWN_HEADING.match(line):
+            if i > start:
+                units.append((start, i - 1, heading))
+            start, heading = i, line.strip().lstrip("#").strip()
+    if start <= len(lines):
+        units.append((start, len(lines), heading))
+    return units
+
+def pack_units(units, lines, budget):
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    groups = []
+    for start, end, symbol in units:
+        if groups and start <= groups[-1][1]:
+            # Statements sharing a line (a = 1; b = 2) stay together.
+            groups[-1][1] = max(groups[-1][1], end)
+        elif groups and offsets[end] - offsets[groups[-1][0] - 1] <= budget:
+            groups[-1][1] = end
+        else:
+            # Blank lines and comments between units belong to the unit that follows.
+            groups.append([groups[-1][1] + 1 if groups else 1, end, []])
+        if symbol and symbol not in groups[-1][2]:
+            groups[-1][2].append(symbol)
+    if groups:
+        groups[-1][1] = len(lines)
+    return groups
+
+def chunk_source(source, path, rel_path, ext, tree=None):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_core.documents import Document
+    metadata = {"source": path, "path": rel_path}
+    if ext not in (".py", ".md") or (ext == ".py" and tree is None):
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        return splitter.split_documents([Document(page_content=source, metadata=metadata)])
+
+    lines = source.splitlines(keepends=True)
+    units = python_units(tree, lines, CHUNK_SIZE) if ext == ".py" else markdown_units(lines)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=0)
+    chunks = []
+    for start, end, symbols in pack_units(units, lines, CHUNK_SIZE):
+        text = "".join(lines[start - 1:end])
+        if len(text) <= CHUNK_SIZE:
+            chunks.append(Document(page_content=text, metadata=dict(
+                metadata, start_line=start, end_line=end, symbols=symbols)))
+            continue
+        # A unit too big for one chunk is split; each piece gets the lines it
+        # covers, counted from where it sits in the unit (pieces do not overlap).
+        offset = 0
+        for piece in splitter.split_text(text):
+            if not piece.strip():
+                continue
+            found = text.find(piece, offset)
+            piece_start, piece_end = start, end
+            if found >= 0:
+                piece_start = start + text.count("\n", 0, found)
+                piece_end = start + text.count("\n", 0, found + len(piece) - 1)
+                offset = found + len(piece)
+            chunks.append(Document(page_content=piece, metadata=dict(
+                metadata, start_line=piece_start, end_line=piece_end, symbols=symbols)))
+    return chunks
+
+# Runs in a worker process: everything it needs comes in as arguments and
+# every result, warnings included, goes back to the parent. Each file is read
+# once; the index entries and the embedding chunks are both cut from that one
+# buffer, and only the chunks leave the worker.
+def index_file(path, rel_path, chunk=True):
+    components, chunks, warnings = [], [], []
+    timings = {"read_s": 0.0, "parse_s": 0.0, "split_s": 0.0}
+    fname = os.path.basename(rel_path)
+    ext = os.path.splitext(fname)[1].lower()
+    start = time.perf_counter()
+    try:
+        source = read_source(path)
+    except Exception as e:
+        warnings.append(f"⚠️ Failed to read {rel_path}: {e}")
+        return components, chunks, warnings, timings
+    timings["read_s"] = time.perf_counter() - start
+    start = time.perf_counter()
+    tree = None
+    try:
+        if ext == ".py":
+            try:
+                tree = ast.parse(source, filename=rel_path)
+            except Exception:
+                tree = None
+            components = parse_python_file_ast(path, source, rel_path, tree) if tree else []
+        else:
+            components = [{
+                "type": "file",
+                "name": fname,
+                "path": rel_path,
+                "lineno": 1,
+                "tags": [],
+                "summary": "",
+                "excerpt": source[:EXCERPT_CHARS]
+            }]
+    except Exception as e:
+        warnings.append(f"⚠️ Failed to parse {rel_path}: {e}")
+    timings["parse_s"] = time.perf_counter() - start
+    if not chunk:
+        return components, chunks, warnings, timings
+    start = time.perf_counter()
+    try:
+        chunks = chunk_source(source, path, rel_path, ext, tree)
+    except Exception as e:
+        warnings.append(f"⚠️ Failed to split for embedding: {path}: {e}")
+    timings["split_s"] = time.perf_counter() - start
+    return components, chunks, warnings, timings
+
+def index_file_args(args):
+    return index_file(*args)
+
+# Yields (rel_path, entries, chunks) per file, for rel_paths in their order (or
+# every source file in walk order), as the workers finish them. With metrics,
+# the per-file read/parse/split times (summed over workers) are added to the
+# "parse" stage.
+def iter_indexed_files(src_dir: str, rel_paths=None, workers=SCAN_WORKERS, chunk=True, metrics=None):
+    if rel_paths is None:
+        tasks = [(path, rel_path, chunk) for path, rel_path in iter_source_files(src_dir)]
+    else:
+        tasks = [(os.path.join(src_dir, rel_path), rel_path, chunk) for rel_path in rel_paths]
+    if workers > 1 and len(tasks) >= PARALLEL_MIN_FILES:
+        chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=configure_rules,
+                                   initargs=(TAG_RULES, FRAMEWORK_RULES, FRAMEWORK_EXTENSIONS))
+        results = pool.map(index_file_args, tasks, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(index_file_args, tasks)
+
+    # map() yields in task order, so the merged index is the same for any worker count.
+    try:
+        for (_, rel_path, _), (components, file_chunks, warnings, timings) in zip(tasks, results):
+            for warning in warnings:
+                print(warning)
+            if metrics:
+                metrics.count("parse", **timings)
+            yield rel_path, components, file_chunks
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+# --- Build metrics ---
+def cpu_seconds():
+    # Includes reaped children, so process-pool workers count once the pool shuts down.
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class BuildMetrics:
+    # Wall and CPU time per stage, stage counters (files, bytes, ...) and
+    # per-kind API call stats. Thread-safe, since summaries are requested from a pool.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.wall = time.perf_counter()
+        self.cpu = cpu_seconds()
+        self.stages = {}
+        self.api = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield
+        finally:
+            self.count(name, wall_s=time.perf_counter() - wall, cpu_s=cpu_seconds() - cpu)
+
+    def count(self, stage, **values):
+        with self.lock:
+            record = self.stages.setdefault(stage, {})
+            for key, value in values.items():
+                record[key] = record.get(key, 0) + value
+
+    def record_call(self, kind, seconds, prompt_tokens=0, completion_tokens=0, error=False):
+        with self.lock:
+            record = self.api.setdefault(kind, {"calls": 0, "errors": 0, "prompt_tokens": 0,
+                                                "completion_tokens": 0, "latencies_ms": []})
+            record["calls"] += 1
+            record["errors"] += int(error)
+            record["prompt_tokens"] += prompt_tokens
+            record["completion_tokens"] += completion_tokens
+            record["latencies_ms"].append(seconds * 1000)
+
+    @staticmethod
+    def latency_summary(samples):
+        ordered = sorted(samples)
+        histogram = {f"<={bound}": 0 for bound in LATENCY_BUCKETS_MS}
+        histogram["inf"] = 0
+        for ms in ordered:
+            bound = next((b for b in LATENCY_BUCKETS_MS if ms <= b), None)
+            histogram[f"<={bound}" if bound else "inf"] += 1
+        pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))], 3)
+        return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": round(ordered[-1], 3),
+                "mean": round(sum(ordered) / len(ordered), 3), "histogram": histogram}
+
+    def report(self, **info):
+        stages = {}
+        for name, record in self.stages.items():
+            record = {key: round(value, 6) if isinstance(value, float) else value for key, value in record.items()}
+            wall = record.get("wall_s")
+            if wall:
+                for key in ("files", "bytes", "entries"):
+                    if key in record:
+                        record[f"{key}_per_s"] = round(record[key] / wall, 1)
+            stages[name] = record
+        api = {}
+        for kind, record in self.api.items():
+            api[kind] = {key: value for key, value in record.items() if key != "latencies_ms"}
+            if record["latencies_ms"]:
+                api[kind]["latency_ms"] = self.latency_summary(record["latencies_ms"])
+        return dict(info,
+                    started=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                    wall_s=round(time.perf_counter() - self.wall, 6),
+                    cpu_s=round(cpu_seconds() - self.cpu, 6),
+                    stages=stages, api=api)
+
+    def save(self, path, **info):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(**info), f, indent=2)
+
+# --- Incremental rebuild manifest ---
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(src_dir, embedder_name):
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # A manifest written for a different tree says nothing about this one.
+    # Vectors from another embedder cannot be mixed with new ones either.
+    if manifest.get("src") != os.path.abspath(src_dir) or manifest.get("embedder") != embedder_name:
+        return {}
+    return manifest
+
+# "stage" is the last stage the indexes were brought up to. After a tag or
+# summarize run the vectors lag behind: "unembedded" maps every file re-indexed
+# since the last embed to the record its vectors were built from (null if it
+# has none), or is null itself when the vector index has to be rebuilt.
+def save_manifest(src_dir, files, embedder_name, stage="embed", unembedded=None):
+    manifest = {"src": os.path.abspath(src_dir), "embedder": embedder_name, "stage": stage}
+    if stage != "embed":
+        manifest["unembedded"] = unembedded
+    manifest["files"] = files
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def scan_changes(src_dir, previous, touched=None):
+    """Return (files, changed, deleted); only files whose size or mtime moved get hashed.
+    With touched (relative paths from a file watcher), only those are checked and
+    every other file keeps its manifest record."""
+    files = {}
+    changed = []
+    candidates = iter_source_files(src_dir)
+    if touched is not None:
+        # Records are replaced in place, so the index files keep their order.
+        files = dict(previous)
+        candidates = []
+        for rel_path in sorted({os.path.normpath(rel_path) for rel_path in touched}):
+            path = os.path.join(src_dir, rel_path)
+            if is_source_file(rel_path) and os.path.isfile(path):
+                candidates.append((path, rel_path))
+            else:
+                files.pop(rel_path, None)
+    for path, rel_path in candidates:
+        try:
+            st = os.stat(path)
+            old = previous.get(rel_path)
+            if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns:
+                files[rel_path] = old
+                continue
+            digest = hash_file(path)
+        except OSError as e:
+            print(f"⚠️ Failed to stat {rel_path}: {e}")
+            files.pop(rel_path, None)
+            continue
+        files[rel_path] = dict(old or {}, size=st.st_size, mtime=st.st_mtime_ns, sha256=digest)
+        if not old or old["sha256"] != digest:
+            changed.append(rel_path)
+    if touched is not None and any(rel_path not in previous for _, rel_path in candidates):
+        # New files go where a full scan would have put them.
+        order = {rel_path: i for i, (_, rel_path) in enumerate(iter_source_files(src_dir))}
+        files = dict(sorted(files.items(), key=lambda item: order.get(item[0], len(order))))
+    deleted = [rel_path for rel_path in previous if rel_path not in files]
+    return files, changed, deleted
+
+# --- JSONL index files ---
+# Each index is one JSON entry per line plus a "<file>.idx" side file mapping
+# every path to its byte span (with the entry names in it) and every name to
+# its line offsets, so readers can mmap the file and seek straight to entries.
+class TextTable:
+    # Content-addressed excerpt store shared by both index files. Entries hold
+    # an "excerpt_id" instead of the text, identical excerpts are stored once,
+    # and refs(path, id) lets texts no file uses any more be pruned once both
+    # index files have been rewritten.
+    def __init__(self, path=TEXT_TABLE_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS texts (id TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS refs (path TEXT, id TEXT, PRIMARY KEY (path, id))")
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+    def put(self, rel_path, text):
+        text_id = self.key(text)
+        self.conn.execute("INSERT OR IGNORE INTO texts (id, text) VALUES (?, ?)", (text_id, text))
+        self.conn.execute("INSERT OR IGNORE INTO refs (path, id) VALUES (?, ?)", (rel_path, text_id))
+        return text_id
+
+    def get(self, text_id):
+        row = self.conn.execute("SELECT text FROM texts WHERE id = ?", (text_id,)).fetchone()
+        return row[0] if row else ""
+
+    def paths(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT path FROM refs")]
+
+    def drop_paths(self, paths):
+        self.conn.executemany("DELETE FROM refs WHERE path = ?", [(p,) for p in paths])
+
+    def prune(self):
+        self.conn.execute("DELETE FROM texts WHERE id NOT IN (SELECT id FROM refs)")
+        self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+class IndexWriter:
+    def __init__(self, path, texts=None):
+        self.path = path
+        self.texts = texts
+        self.f = open(path + ".tmp", "wb")
+        self.offset = 0
+        self.count = 0
+        self.paths = {}
+        self.names = {}
+
+    def write_line(self, rel_path, name, line):
+        start = self.offset
+        self.f.write(line)
+        self.offset += len(line)
+        self.count += 1
+        span = self.paths.setdefault(rel_path, [start, start, []])
+        span[1] = self.offset
+        span[2].append(name)
+        self.names.setdefault(name, []).append(start)
+
+    def write(self, entry):
+        if self.texts is not None and "excerpt" in entry:
+            entry = dict(entry)
+            entry["excerpt_id"] = self.texts.put(entry["path"], entry.pop("excerpt"))
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        self.write_line(entry["path"], entry["name"], line)
+
+    # Copies a path's lines from a previous index without parsing them.
+    def copy(self, reader, rel_path):
+        lines = reader.raw(rel_path).splitlines(keepends=True)
+        for line, name in zip(lines, reader.paths[rel_path][2]):
+            self.write_line(rel_path, name, line)
+
+    def close(self):
+        self.f.close()
+        offsets = {"size": self.offset, "count": self.count, "paths": self.paths, "names": self.names}
+        with open(self.path + ".idx.tmp", "w", encoding="utf-8") as f:
+            json.dump(offsets, f, ensure_ascii=False, separators=(",", ":"))
+        # The new entries' texts must be stored before the entries become visible.
+        if self.texts is not None:
+            self.texts.commit()
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(self.path + ".idx.tmp", self.path + ".idx")
+
+class IndexReader:
+    # With a TextTable, entries come back with their "excerpt" text filled in.
+    def __init__(self, path, texts=None):
+        self.path = path
+        self.texts = texts
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            with open(path + ".idx", "r", encoding="utf-8") as f:
+                offsets = json.load(f)
+        except (OSError, ValueError):
+            offsets = None
+        # A missing or stale side file (e.g. a crash between the two renames) is rebuilt by scanning.
+        if not offsets or offsets.get("size") != size:
+            offsets = self.scan()
+        self.count = offsets["count"]
+        self.paths = offsets["paths"]
+        self.names = offsets["names"]
+
+    def scan(self):
+        paths, names, count, start = {}, {}, 0, 0
+        while start < len(self.mm):
+            end = self.mm.find(b"\n", start) + 1 or len(self.mm)
+            entry = json.loads(self.mm[start:end])
+            span = paths.setdefault(entry["path"], [start, start, []])
+            span[1] = end
+            span[2].append(entry["name"])
+            names.setdefault(entry["name"], []).append(start)
+            count += 1
+            start = end
+        return {"count": count, "paths": paths, "names": names}
+
+    def __len__(self):
+        return self.count
+
+    def load(self, line):
+        entry = json.loads(line)
+        if self.texts is not None and "excerpt_id" in entry:
+            entry["excerpt"] = self.texts.get(entry["excerpt_id"])
+        return entry
+
+    def __iter__(self):
+        for _, entry in self.items():
+            yield entry
+
+    def items(self):
+        start = 0
+        while start < len(self.mm):
+            end = self.mm.find(b"\n", start) + 1 or len(self.mm)
+            yield start, self.load(self.mm[start:end])
+            start = end
+
+    def raw(self, rel_path):
+        start, end, _ = self.paths.get(rel_path, (0, 0, []))
+        return self.mm[start:end]
+
+    def entry_at(self, offset):
+        end = self.mm.find(b"\n", offset) + 1 or len(self.mm)
+        return self.load(self.mm[offset:end])
+
+    def by_path(self, rel_path):
+        return [self.load(line) for line in self.raw(rel_path).splitlines()]
+
+    def by_name(self, name):
+        return [self.entry_at(offset) for offset in self.names.get(name, [])]
+
+    def close(self):
+        if self.mm:
+            self.mm.close()
+        self.file.close()
+
+def open_index(path):
+    try:
+        return IndexReader(path)
+    except (OSError, ValueError):
+        return None
+
+# --- Lexical index ---
+# "<index>.lex" layout: b"LEX1", a little-endian u64 header length, a JSON
+# header (term -> [offset, count], padded to 8 bytes), u64 byte offsets of
+# every entry in the JSONL, then per term its u32 doc ids followed by their
+# f32 weights. Terms are "name:<symbol>", "tag:<tag>", "path:<dir>/" or
+# "path:<file>", and "text:<token>" with precomputed BM25 weights over the
+# name, summary, path, tags and component.
+LEXICAL_MAGIC = b"LEX1"
+
+def lexical_tokens(text):
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def lexical_terms(entry):
+    tags = entry.get("tags", [])
+    exact = {f"name:{entry['name']}"} | {f"tag:{tag}" for tag in tags}
+    parts = entry["path"].replace(os.sep, "/").split("/")
+    exact.update("path:" + "/".join(parts[:i]) + "/" for i in range(1, len(parts)))
+    exact.add("path:" + "/".join(parts))
+    text = " ".join([entry["name"], entry.get("summary", ""), entry["path"],
+                     " ".join(tags), entry.get("component", "")])
+    return exact, lexical_tokens(text)
+
+def build_lexical_index(index_file=OUTPUT_FILE, out_file=LEXICAL_FILE):
+    offsets, lengths, exact, text = [], [], {}, {}
+    reader = IndexReader(index_file)
+    try:
+        for doc_id, (offset, entry) in enumerate(reader.items()):
+            offsets.append(offset)
+            entry_exact, tokens = lexical_terms(entry)
+            lengths.append(len(tokens))
+            for term in sorted(entry_exact):
+                exact.setdefault(term, []).append(doc_id)
+            for token in tokens:
+                tf = text.setdefault(token, {})
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+        source_size = len(reader.mm)
+    finally:
+        reader.close()
+
+    count = len(offsets)
+    avgdl = (sum(lengths) / count) if count else 0.0
+    terms, blobs, position = {}, [], 0
+
+    def add(term, ids, weights):
+        nonlocal position
+        terms[term] = [position, len(ids)]
+        blob = np.asarray(ids, dtype="<u4").tobytes() + np.asarray(weights, dtype="<f4").tobytes()
+        blobs.append(blob)
+        position += len(blob)
+
+    for term, ids in exact.items():
+        add(term, ids, [1.0] * len(ids))
+    for token, tf in text.items():
+        idf = math.log(1 + (count - len(tf) + 0.5) / (len(tf) + 0.5))
+        ids = sorted(tf)
+        add(f"text:{token}", ids, [
+            idf * tf[i] * (BM25_K1 + 1) / (tf[i] + BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / avgdl))
+            for i in ids
+        ])
+
+    header = json.dumps({"docs": count, "source_size": source_size, "terms": terms},
+                        ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(len(LEXICAL_MAGIC) + 8 + len(header)) % 8)
+    with open(out_file + ".tmp", "wb") as f:
+        f.write(LEXICAL_MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(np.asarray(offsets, dtype="<u8").tobytes())
+        for blob in blobs:
+            f.write(blob)
+    os.replace(out_file + ".tmp", out_file)
+    return len(terms)
+
+class LexicalIndex:
+    # Only the term dictionary is parsed; doc offsets and postings are read
+    # straight out of the mmap with numpy views.
+    def __init__(self, path=LEXICAL_FILE):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:4] != LEXICAL_MAGIC:
+            raise ValueError(f"{path} is not a lexical index")
+        (header_len,) = struct.unpack_from("<Q", self.mm, 4)
+        header = json.loads(self.mm[12:12 + header_len])
+        self.count = header["docs"]
+        self.source_size = header["source_size"]
+        self.terms = header["terms"]
+        base = 12 + header_len
+        self.offsets = np.frombuffer(self.mm, dtype="<u8", count=self.count, offset=base)
+        self.postings_base = base + 8 * self.count
+
+    def postings(self, term):
+        location = self.terms.get(term)
+        if location is None:
+            return np.empty(0, dtype="<u4"), np.empty(0, dtype="<f4")
+        position, count = location
+        start = self.postings_base + position
+        ids = np.frombuffer(self.mm, dtype="<u4", count=count, offset=start)
+        weights = np.frombuffer(self.mm, dtype="<f4", count=count, offset=start + 4 * count)
+        return ids, weights
+
+    def symbol(self, name):
+        return self.postings(f"name:{name}")[0].tolist()
+
+    def tag(self, tag):
+        return self.postings(f"tag:{tag if tag.startswith('#') else '#' + tag}")[0].tolist()
+
+    def path(self, prefix):
+        prefix = prefix.replace(os.sep, "/")
+        if prefix.startswith("./"):
+            prefix = prefix[2:]
+        ids = self.postings(f"path:{prefix}")[0]
+        if not len(ids) and not prefix.endswith("/"):
+            ids = self.postings(f"path:{prefix}/")[0]
+        return ids.tolist()
+
+    # BM25 over the "text:" terms; returns [(doc_id, score)] best first.
+    def search(self, text, k=10):
+        found = [self.postings(f"text:{token}") for token in set(lexical_tokens(text))]
+        found = [(ids, weights) for ids, weights in found if len(ids)]
+        if not found:
+            return []
+        ids = np.concatenate([ids for ids, _ in found])
+        weights = np.concatenate([weights for _, weights in found])
+        docs, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(int(docs[i]), float(scores[i])) for i in top]
+
+    def entry_offset(self, doc_id):
+        return int(self.offsets[doc_id])
+
+    def close(self):
+        self.offsets = None
+        self.mm.close()
+        self.file.close()
+
+# Streams fresh entries and the untouched lines of the previous index out in walk order.
+# fresh yields (rel_path, entries) for the re-indexed files in the same order
+# as order, so each file is written as soon as it arrives and none are held.
+def write_index(path, previous, fresh, order, dropped, texts=None):
+    fresh = iter(fresh)
+    pending = next(fresh, None)
+    writer = IndexWriter(path, texts)
+    for rel_path in order:
+        if pending is not None and pending[0] == rel_path:
+            for entry in pending[1]:
+                writer.write(entry)
+            pending = next(fresh, None)
+        elif previous is not None and rel_path not in dropped and rel_path in previous.paths:
+            writer.copy(previous, rel_path)
+    writer.close()
+    return writer.count
+
+def classify_entry(entry):
+    tags, frameworks = MATCHER.classify(entry.get("excerpt", ""), entry.get("name", ""))
+    return sorted(tags.union(entry.get("tags", []))), frameworks
 
 def auto_tag(entry):
-    tags = set(entry.get("tags", []))
-    content = (entry.get("excerpt", "") + entry.get("name", "")).lower()
-    for key, tag in TAG_RULES.items():
-        if key in content:
-            tags.add(tag)
-    return sorted(list(tags))
+    return classify_entry(entry)[0]
 
 def detect_frameworks(entry):
-    excerpt = entry.get("excerpt", "").lower()
-    frameworks = []
-    if "react" in excerpt or entry["name"].endswith(".tsx"):
-        frameworks.append("React")
-    if "vite" in excerpt:
-        frameworks.append("Vite")
-    if "@radix-ui" in excerpt:
-        frameworks.append("Radix UI")
-    if "tailwind" in excerpt:
-        frameworks.append("Tailwind")
-    return frameworks
+    return classify_entry(entry)[1]
 
 def detect_language(filename):
     ext = os.path.splitext(filename)[1]
@@ -169,76 +964,709 @@ def detect_language(filename):
         ".py": "Python"
     }.get(ext, "Unknown")
 
-def summarize_entry(entry):
-    prompt = f"""Summarize the following code excerpt in one natural sentence suitable for developers reviewing a project structure. Be specific about what the file or function does.
+class RateLimiter:
+    # Two token buckets (requests and tokens per minute) refilled continuously.
+    # A limit of 0 disables that bucket.
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE):
+        self.capacity = [float(rpm), float(tpm)]
+        self.level = list(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
-Excerpt:
-{entry.get("excerpt", "")}
-"""
+    def acquire(self, tokens):
+        need = [1.0, float(min(tokens, self.capacity[1]))]
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                elapsed = now - self.updated
+                self.updated = now
+                wait = 0.0
+                for i, capacity in enumerate(self.capacity):
+                    if not capacity:
+                        continue
+                    self.level[i] = min(capacity, self.level[i] + elapsed * capacity / 60.0)
+                    if self.level[i] < need[i]:
+                        wait = max(wait, (need[i] - self.level[i]) * 60.0 / capacity)
+                if not wait:
+                    for i, capacity in enumerate(self.capacity):
+                        if capacity:
+                            self.level[i] -= need[i]
+                    return
+            time.sleep(wait)
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def retry_delay(error, attempt):
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+    return min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+class SummaryCache:
+    # (model, prompt version, excerpt hash) -> summary, evicted least-recently-used first.
+    def __init__(self, path=SUMMARY_CACHE_FILE, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_used ON summaries (used)")
+        self.clock = self.conn.execute("SELECT COALESCE(MAX(used), 0) FROM summaries").fetchone()[0]
+
+    @staticmethod
+    def key(excerpt, model=SUMMARY_MODEL):
+        digest = hashlib.sha256(excerpt.encode("utf-8")).hexdigest()
+        return f"{model}:{SUMMARY_PROMPT_VERSION}:{digest}"
+
+    def get(self, key):
+        row = self.conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.clock += 1
+        self.conn.execute("UPDATE summaries SET used = ? WHERE key = ?", (self.clock, key))
+        return row[0]
+
+    def put(self, key, summary):
+        self.clock += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, summary, used) VALUES (?, ?, ?)",
+            (key, summary, self.clock),
+        )
+
+    def close(self):
+        self.conn.execute(
+            "DELETE FROM summaries WHERE key NOT IN "
+            "(SELECT key FROM summaries ORDER BY used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self.conn.commit()
+        self.conn.close()
+        print(f"🗄️ Summary cache: {self.hits} hits, {self.misses} misses")
+
+def chat_completion(prompt, max_tokens, limiter=None, metrics=None):
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            limiter.acquire(estimate_tokens(prompt) + max_tokens)
+        start = time.perf_counter()
+        try:
+            response = get_client().chat.completions.create(model=SUMMARY_MODEL,
+            messages=[{
+                "role": "user",
+                "content": prompt
+            }],
+            temperature=0.5,
+            max_tokens=max_tokens)
+            content = response.choices[0].message.content.strip()
+            if metrics:
+                usage = getattr(response, "usage", None)
+                metrics.record_call("chat", time.perf_counter() - start,
+                                    getattr(usage, "prompt_tokens", None) or estimate_tokens(prompt),
+                                    getattr(usage, "completion_tokens", None) or estimate_tokens(content))
+            return content
+        except Exception as e:
+            if metrics:
+                metrics.record_call("chat", time.perf_counter() - start, error=True)
+            from openai import APIConnectionError
+            retryable = isinstance(e, APIConnectionError) or getattr(e, "status_code", None) in RETRY_STATUSES
+            if not retryable or attempt == MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(e, attempt))
+
+def summarize_entry(entry, limiter=None, metrics=None):
+    prompt = SUMMARY_PROMPT.format(excerpt=entry.get("excerpt", ""))
     try:
-        response = client.chat.completions.create(model="gpt-4",
-        messages=[{
-            "role": "user",
-            "content": prompt
-        }],
-        temperature=0.5,
-        max_tokens=80)
-        return response.choices[0].message.content.strip()
+        return chat_completion(prompt, SUMMARY_MAX_TOKENS, limiter, metrics)
     except Exception as e:
         print(f"⚠️ OpenAI error for {entry.get('name')}: {e}")
         return ""
 
-def enhance_index(entries):
-    enhanced = []
+def plan_batches(entries, budget=SUMMARY_BATCH_TOKENS, max_size=SUMMARY_BATCH_MAX):
+    if budget <= 0:
+        return [[entry] for entry in entries]
+    batches = []
+    batch, used = [], estimate_tokens(SUMMARY_BATCH_PROMPT)
     for entry in entries:
-        print(f"🔍 Enhancing {entry['path']}:{entry.get('name')}")
-        entry["tags"] = auto_tag(entry)
-        entry["frameworks"] = detect_frameworks(entry)
-        entry["lang"] = detect_language(entry["name"])
-        entry["summary"] = entry["summary"] or summarize_entry(entry)
-        if "component" not in entry:
-            entry["component"] = re.sub(r"[-_]", " ", os.path.splitext(entry["name"])[0]).title()
-        enhanced.append(entry)
-        time.sleep(0.5)
-    return enhanced
-
-def build_ai_index(src_dir: str, idx_dir: str):
+        cost = estimate_tokens(entry.get("excerpt", "")) + 16
+        if batch and (used + cost > budget or len(batch) >= max_size):
+            batches.append(batch)
+            batch, used = [], estimate_tokens(SUMMARY_BATCH_PROMPT)
+        batch.append(entry)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+def parse_batch_summaries(content, count):
+    summaries = [None] * count
+    start, end = content.find("{"), content.rfind("}")
+    try:
+        items = json.loads(content[start:end + 1])["summaries"]
+    except (ValueError, KeyError, TypeError):
+        return summaries
+    for item in items if isinstance(items, list) else []:
+        try:
+            i, summary = int(item["id"]), item["summary"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= i < count and isinstance(summary, str) and summary.strip():
+            summaries[i] = summary.strip()
+    return summaries
+
+# Anything the batched reply leaves out, or gets wrong, is re-asked one entry at a time.
+def summarize_batch(entries, limiter=None, metrics=None):
+    if len(entries) == 1:
+        return [summarize_entry(entries[0], limiter, metrics)]
+    excerpts = "\n".join(
+        json.dumps({"id": i, "excerpt": entry.get("excerpt", "")}) for i, entry in enumerate(entries)
+    )
+    try:
+        content = chat_completion(SUMMARY_BATCH_PROMPT.format(excerpts=excerpts),
+                                  SUMMARY_MAX_TOKENS * len(entries), limiter, metrics)
+        summaries = parse_batch_summaries(content, len(entries))
+    except Exception as e:
+        print(f"⚠️ OpenAI error for batch of {len(entries)}: {e}")
+        summaries = [None] * len(entries)
+    missing = summaries.count(None)
+    if missing:
+        print(f"⚠️ Batch reply missing {missing}/{len(entries)} summaries, retrying them singly")
+    return [summary if summary is not None else summarize_entry(entry, limiter, metrics)
+            for summary, entry in zip(summaries, entries)]
+
+# Adds the excerpts of entries without a summary to pending ({cache key: entry
+# with just name and excerpt}), so identical excerpts share one lookup and at
+# most one request, and the entries themselves need not be kept.
+def add_pending_summaries(pending, entries):
+    for entry in entries:
+        if not entry["summary"]:
+            excerpt = entry.get("excerpt", "")
+            pending.setdefault(SummaryCache.key(excerpt), {"name": entry.get("name"), "excerpt": excerpt})
+    return pending
+
+# Returns {cache key: summary} for pending. With summarize=False only cached
+# summaries are looked up and no request is made.
+def summarize_pending(pending, workers=SUMMARY_WORKERS, limiter=None, cache=None,
+                      batch_tokens=SUMMARY_BATCH_TOKENS, summarize=True, metrics=None):
+    limiter = limiter or RateLimiter()
+    metrics = metrics or BuildMetrics()
+    summaries = {}
+    misses = []
+    with metrics.stage("summary_cache"):
+        for key, entry in pending.items():
+            summary = cache.get(key) if cache else None
+            if summary is None:
+                misses.append((key, entry))
+            else:
+                summaries[key] = summary
+    metrics.count("summary_cache", hits=len(pending) - len(misses), misses=len(misses))
+
+    if misses and not summarize:
+        print(f"⏭️ Skipping {len(misses)} uncached summaries")
+    elif misses:
+        get_client()
+        batches = plan_batches([entry for _, entry in misses], batch_tokens)
+        print(f"🧠 Summarizing {len(misses)} unique excerpts in {len(batches)} requests with {workers} workers")
+        # map() yields in submission order, so the output stays deterministic.
+        with metrics.stage("summarize"), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = pool.map(lambda batch: summarize_batch(batch, limiter, metrics), batches)
+            failed = 0
+            for (key, _), summary in zip(misses, (summary for batch in results for summary in batch)):
+                # A failed request comes back as "", which is never cached so it is asked again.
+                if not summary:
+                    failed += 1
+                elif cache:
+                    cache.put(key, summary)
+                summaries[key] = summary
+        metrics.count("summarize", entries=len(misses), batches=len(batches), failed=failed)
+        if failed:
+            print(f"⚠️ {failed} summaries failed; their files are retried on the next run")
+    return summaries
+
+# Tags an entry and fills in its summary from summarize_pending()'s result.
+def enhance_entry(entry, summaries):
+    print(f"🔍 Enhancing {entry['path']}:{entry.get('name')}")
+    entry["tags"], entry["frameworks"] = classify_entry(entry)
+    entry["lang"] = detect_language(entry["name"])
+    if not entry["summary"]:
+        entry["summary"] = summaries.get(SummaryCache.key(entry.get("excerpt", "")), "")
+    if "component" not in entry:
+        entry["component"] = re.sub(r"[-_]", " ", os.path.splitext(entry["name"])[0]).title()
+    return entry
+
+# --- Embeddings ---
+class HashingEmbeddings:
+    # Signed feature hashing of word tokens and character trigrams. Needs no
+    # network or key and always returns the same vector for the same text.
+    def __init__(self, dim=HASH_EMBEDDING_DIM, ngram=3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def embed_text(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        lower = text.lower()
+        features = re.findall(r"\w+", lower)
+        features.extend(lower[i:i + self.ngram] for i in range(len(lower) - self.ngram + 1))
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_text(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_text(text)
+
+class EmbeddingCache:
+    # Append-only cache: <name>.f32 holds raw float32 rows (read through a
+    # memmap) and <name>.keys holds the dimension followed by one chunk hash per row.
+    def __init__(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        self.keys_path = os.path.join(directory, f"{safe}.keys")
+        self.vectors_path = os.path.join(directory, f"{safe}.f32")
+        self.dim = None
+        self.rows = {}
+        self.count = 0
+        self.vectors = None
+        self.hits = 0
+        self.misses = 0
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            self.dim = int(f.readline() or 0) or None
+            keys = [line.strip() for line in f]
+        if not self.dim:
+            return
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        # Rows past the shorter of the two files (and a partial trailing row) come
+        # from an interrupted append. Both files are cut back to the rows they share,
+        # so later appends line up again.
+        count = min(len(keys), size // (4 * self.dim))
+        if size != count * 4 * self.dim:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(count * 4 * self.dim)
+        if len(keys) != count:
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.write(f"{self.dim}\n")
+                f.writelines(f"{key}\n" for key in keys[:count])
+        self.rows = {key: i for i, key in enumerate(keys[:count])}
+        self.count = count
+        self.reopen(count)
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def reopen(self, count):
+        self.vectors = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            if count else None
+        )
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.vectors[row].tolist()
+
+    def add(self, keys, vectors):
+        array = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = array.shape[1]
+            with open(self.keys_path, "w", encoding="utf-8") as f:
+                f.write(f"{self.dim}\n")
+            open(self.vectors_path, "wb").close()
+        start = self.count
+        with open(self.vectors_path, "ab") as f:
+            f.write(array.tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in keys)
+        for i, key in enumerate(keys):
+            self.rows[key] = start + i
+        self.count += len(keys)
+        self.reopen(self.count)
+
+class CachedEmbeddings:
+    # Looks every text up in the cache and embeds the misses in fixed-size batches.
+    def __init__(self, embedder, cache=None, batch_size=EMBED_BATCH_SIZE, metrics=None):
+        self.embedder = embedder
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.metrics = metrics
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        vectors = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            key = EmbeddingCache.key(text)
+            vector = self.cache.get(key) if self.cache else None
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                vectors[i] = vector
+        keys = list(missing)
+        for start in range(0, len(keys), self.batch_size):
+            batch = keys[start:start + self.batch_size]
+            batch_texts = [texts[missing[key][0]] for key in batch]
+            began = time.perf_counter()
+            try:
+                embedded = self.embedder.embed_documents(batch_texts)
+            except Exception:
+                if self.metrics:
+                    self.metrics.record_call("embeddings", time.perf_counter() - began, error=True)
+                raise
+            if self.metrics:
+                self.metrics.record_call("embeddings", time.perf_counter() - began,
+                                         sum(estimate_tokens(text) for text in batch_texts))
+            self.calls += 1
+            if self.cache:
+                self.cache.add(batch, embedded)
+            for key, vector in zip(batch, embedded):
+                for i in missing[key]:
+                    vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        return self.embedder.embed_query(text)
+
+def embedder_name(name=EMBEDDER):
+    return f"hash-{HASH_EMBEDDING_DIM}" if name == "hash" else "openai-text-embedding-ada-002"
+
+def make_embedder(name=EMBEDDER, batch_size=EMBED_BATCH_SIZE, cache_dir=EMBEDDING_CACHE_DIR, metrics=None):
+    # Registered rather than subclassed so this module can load without langchain.
+    from langchain_core.embeddings import Embeddings
+    Embeddings.register(CachedEmbeddings)
+    if name == "hash":
+        embedder = HashingEmbeddings()
+    else:
+        require_api_key()
+        from langchain_community.embeddings import OpenAIEmbeddings
+        embedder = OpenAIEmbeddings()
+    cache = EmbeddingCache(cache_dir, embedder_name(name)) if cache_dir else None
+    return CachedEmbeddings(embedder, cache, batch_size, metrics)
+
+def document_path(doc, src_dir):
+    # Stores written before the manifest existed only carry the loader's "source".
+    return doc.metadata.get("path") or os.path.relpath(doc.metadata["source"], src_dir)
+
+# Chunk ids are "<path>::<n>", so a file's vectors can be found from its path alone.
+# Every such id of a dropped path goes, not just as many as the manifest counted:
+# a build interrupted between saving the store and the manifest leaves the new ones.
+def stale_chunk_ids(store, manifest, dropped, src_dir):
+    # Stores built before chunk ids were stable have to be searched by document path.
+    legacy = {rel_path for rel_path in dropped
+              if manifest.get(rel_path) is not None and "chunks" not in manifest[rel_path]}
+    ids = []
+    for doc_id in store.index_to_docstore_id.values():
+        if doc_id.rpartition("::")[0] in dropped:
+            ids.append(doc_id)
+        elif legacy and document_path(store.docstore.search(doc_id), src_dir) in legacy:
+            ids.append(doc_id)
+    return ids
+
+# Save next to the live index and swap directories, so readers and crashes only see a complete index.
+def save_store_atomic(store, idx_dir):
+    idx_dir = os.path.normpath(idx_dir)
+    tmp_dir, old_dir = idx_dir + ".tmp", idx_dir + ".old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    store.save_local(tmp_dir)
+    if os.path.isdir(idx_dir):
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(idx_dir, old_dir)
+    os.rename(tmp_dir, idx_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def recover_store_dir(idx_dir):
+    old_dir = os.path.normpath(idx_dir) + ".old"
+    if not os.path.isdir(idx_dir) and os.path.isdir(old_dir):
+        os.rename(old_dir, idx_dir)
+
+# An incremental update could not load the existing store. The chunks at hand
+# only cover the changed files, so the caller has to rebuild from every file.
+class StoreLoadError(Exception):
+    pass
+
+# Deletes the vectors of changed and deleted files and adds the new chunks in
+# place. Returns the chunk count per re-embedded file for the manifest.
+def update_vector_store(chunks, idx_dir, src_dir, dropped, full, embedder, manifest, metrics=None):
+    from langchain_community.vectorstores import FAISS
+    metrics = metrics or BuildMetrics()
+    print(f"✔️ Split into {len(chunks)} embedding chunks.")
+
+    counts = {}
+    ids = []
+    for chunk in chunks:
+        rel_path = document_path(chunk, src_dir)
+        ids.append(f"{rel_path}::{counts.get(rel_path, 0)}")
+        counts[rel_path] = counts.get(rel_path, 0) + 1
+
+    store = None
+    with metrics.stage("vector_load"):
+        if not full:
+            try:
+                store = FAISS.load_local(idx_dir, embedder, allow_dangerous_deserialization=True)
+            except Exception as e:
+                raise StoreLoadError(e) from e
+        if store is not None:
+            stale = stale_chunk_ids(store, manifest, dropped, src_dir)
+            if stale:
+                store.delete(stale)
+            metrics.count("vector_load", removed=len(stale))
+            print(f"♻️ Removed {len(stale)} stale vectors, keeping {store.index.ntotal}.")
+
+    if store is None and not chunks:
+        print("❌ No documents found to embed.")
+        return counts
+
+    with metrics.stage("embed"):
+        vectors = embedder.embed_documents([c.page_content for c in chunks]) if chunks else []
+    metrics.count("embed", entries=len(chunks), bytes=sum(len(c.page_content.encode("utf-8")) for c in chunks))
+    if embedder.cache:
+        metrics.count("embed", cache_hits=embedder.cache.hits, cache_misses=embedder.cache.misses)
+        print(f"🗄️ Embedding cache: {embedder.cache.hits} hits, {embedder.cache.misses} misses, "
+              f"{embedder.calls} embedding requests")
+    text_embeddings = [(chunk.page_content, vector) for chunk, vector in zip(chunks, vectors)]
+    metadatas = [chunk.metadata for chunk in chunks]
+    with metrics.stage("vector_add"):
+        if store is None:
+            store = FAISS.from_embeddings(text_embeddings, embedder, metadatas=metadatas, ids=ids)
+        elif chunks:
+            store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    with metrics.stage("vector_save"):
+        save_store_atomic(store, idx_dir)
+    metrics.count("vector_save", vectors=store.index.ntotal)
+    print(f"🎉 FAISS vector index saved to {idx_dir} ({store.index.ntotal} vectors)")
+    return counts
+
+def build_ai_index(src_dir: str, idx_dir: str, full: bool = False,
+                   workers: int = SUMMARY_WORKERS, rpm: int = REQUESTS_PER_MINUTE,
+                   tpm: int = TOKENS_PER_MINUTE, summary_cache: str = SUMMARY_CACHE_FILE,
+                   batch_tokens: int = SUMMARY_BATCH_TOKENS, embedder: str = EMBEDDER,
+                   embed_batch: int = EMBED_BATCH_SIZE, embedding_cache: str = EMBEDDING_CACHE_DIR,
+                   scan_workers: int = SCAN_WORKERS, stage: str = "embed",
+                   metrics_file: str = METRICS_FILE, touched=None, llm: bool = True):
     if not os.path.isdir(src_dir):
         print(f"ERROR: Source directory not found: '{src_dir}'")
         sys.exit(1)
 
-    print(f"\n🔍 Scanning: {src_dir}")
-    docs = load_documents_and_index(src_dir)
-    print(f"✔️ Master index has {len(master_index)} components")
+    metrics = BuildMetrics()
+    info = {"src": os.path.abspath(src_dir), "stage": stage, "embedder": embedder_name(embedder), "llm": llm}
+    summarize = llm and stage not in ("scan", "parse", "tag")
+    try:
+        print(f"\n🔍 Scanning: {src_dir}")
+        recover_store_dir(idx_dir)
+        texts = None
+        previous_base = open_index(INPUT_FILE)
+        previous_enhanced = open_index(OUTPUT_FILE)
+        saved = {} if full else load_manifest(src_dir, embedder_name(embedder))
+        if previous_base is None or previous_enhanced is None:
+            saved = {}
+        manifest = saved.get("files", {})
+        unembedded = saved.get("unembedded", {}) if saved.get("stage", "embed") != "embed" else {}
+        if not os.path.isdir(idx_dir):
+            unembedded = None
+        if unembedded is None and stage == "embed":
+            manifest, unembedded = {}, {}
+        if not manifest:
+            full = True
+        info["full"] = full
 
-    with open(INPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(master_index, f, indent=2)
-        print(f"📄 Saved base index to {INPUT_FILE}")
+        try:
+            with metrics.stage("scan"):
+                files, changed, deleted = scan_changes(src_dir, manifest, None if full else touched)
+                if summarize:
+                    # Files whose summaries were skipped (--no-llm) or failed get them now.
+                    unsummarized = [rel_path for rel_path, record in files.items()
+                                    if record.get("summarized") is False and rel_path not in changed]
+                    for rel_path in unsummarized:
+                        files[rel_path] = dict(files[rel_path])
+                    changed.extend(unsummarized)
+                if stage == "embed" and not full:
+                    # Files re-indexed by tag/summarize runs still need their vectors.
+                    lagging = [rel_path for rel_path in unembedded if rel_path in files and rel_path not in changed]
+                    for rel_path in lagging:
+                        files[rel_path] = dict(files[rel_path])
+                    changed.extend(lagging)
+            metrics.count("scan", files=len(files), bytes=sum(record["size"] for record in files.values()),
+                          changed=len(changed), deleted=len(deleted))
+            if stage == "scan":
+                print(f"✔️ {len(changed)} changed/added, {len(deleted)} deleted, "
+                      f"{len(files) - len(changed)} unchanged files")
+                return
+            if not full and not changed and not deleted and not (stage == "embed" and unembedded):
+                save_manifest(src_dir, files, embedder_name(embedder), saved.get("stage", "embed"), unembedded)
+                if not os.path.exists(LEXICAL_FILE):
+                    build_lexical_index(OUTPUT_FILE, LEXICAL_FILE)
+                print("✅ Index is up to date, nothing to rebuild.")
+                return
+            print(f"✔️ {len(changed)} changed/added, {len(deleted)} deleted, "
+                  f"{len(files) - len(changed)} unchanged files")
 
-    enhanced = enhance_index(master_index)
+            dropped = set(files) if full else set(changed) | set(deleted)
+            reindexed = [rel_path for rel_path in files if rel_path in dropped]
+            texts = TextTable(TEXT_TABLE_FILE)
+            texts.drop_paths(texts.paths() if full else dropped)
+            # Each file goes into the base index as soon as it is parsed. Only its
+            # embedding chunks and the excerpts still to summarize are kept.
+            chunks, pending, parsed = [], {}, 0
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(enhanced, f, indent=2)
-        print(f"🎯 Saved enhanced index to {OUTPUT_FILE}")
+            def parse_results():
+                nonlocal parsed
+                for rel_path, components, file_chunks in iter_indexed_files(
+                        src_dir, reindexed, workers=scan_workers, chunk=stage == "embed", metrics=metrics):
+                    chunks.extend(file_chunks)
+                    add_pending_summaries(pending, components)
+                    parsed += len(components)
+                    yield rel_path, components
 
-    if not docs:
-        print("❌ No documents found to embed.")
-        return
+            with metrics.stage("parse"):
+                count = write_index(INPUT_FILE, previous_base, parse_results(), files, dropped, texts)
+            metrics.count("parse", files=len(reindexed), bytes=sum(files[rel_path]["size"] for rel_path in reindexed),
+                          entries=parsed, chunks=len(chunks))
+            print(f"✔️ Master index has {count} components ({parsed} re-parsed)")
+            print(f"📄 Saved base index to {INPUT_FILE}")
+            if stage == "parse":
+                print("⏭️ Stopped after the parse stage; the vector index and manifest were not updated.")
+                return
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-    print(f"✔️ Split into {len(chunks)} embedding chunks.")
+            cache = SummaryCache(summary_cache) if summary_cache else None
+            try:
+                summaries = summarize_pending(pending, workers=workers, limiter=RateLimiter(rpm, tpm),
+                                              cache=cache, batch_tokens=batch_tokens, summarize=summarize,
+                                              metrics=metrics)
+            finally:
+                if cache:
+                    cache.close()
+            pending = None
+
+            # The re-parsed entries are read back from the base index one file at a time.
+            unfinished = set()
 
-    embedder = OpenAIEmbeddings()
-    store = FAISS.from_documents(chunks, embedder)
-    os.makedirs(idx_dir, exist_ok=True)
-    store.save_local(idx_dir)
-    print(f"🎉 FAISS vector index saved to {idx_dir}")
+            def enhanced_results():
+                for rel_path in reindexed:
+                    file_entries = base.by_path(rel_path)
+                    for entry in file_entries:
+                        # Written again after the enhanced fields, as for a freshly parsed entry.
+                        del entry["excerpt_id"]
+                        enhance_entry(entry, summaries)
+                    if any(not entry["summary"] for entry in file_entries):
+                        unfinished.add(rel_path)
+                    yield rel_path, file_entries
+
+            info["matcher"] = MATCHER.backend
+            hint = "" if MATCHER.automaton is not None else " (pip install pyahocorasick for a single-pass matcher)"
+            print(f"🏷️ Tagging {parsed} entries against {len(MATCHER.rules)} keywords with the {MATCHER.backend} matcher{hint}")
+            base = IndexReader(INPUT_FILE, texts)
+            try:
+                with metrics.stage("tag"):
+                    write_index(OUTPUT_FILE, previous_enhanced, enhanced_results(), files, dropped, texts)
+            finally:
+                base.close()
+            metrics.count("tag", entries=parsed)
+            texts.prune()
+            for rel_path in reindexed:
+                if rel_path in unfinished:
+                    files[rel_path]["summarized"] = False
+                else:
+                    files[rel_path].pop("summarized", None)
+            print(f"🎯 Saved enhanced index to {OUTPUT_FILE}")
+            with metrics.stage("lexical"):
+                terms = build_lexical_index(OUTPUT_FILE, LEXICAL_FILE)
+            metrics.count("lexical", terms=terms)
+            print(f"🔤 Saved lexical index with {terms} terms to {LEXICAL_FILE}")
+            if stage != "embed":
+                if not full and unembedded is not None:
+                    unembedded = dict(unembedded)
+                    for rel_path in dropped:
+                        unembedded.setdefault(rel_path, manifest.get(rel_path))
+                save_manifest(src_dir, files, embedder_name(embedder), stage, None if full else unembedded)
+                print(f"⏭️ Stopped after the {stage} stage; the vector index was not updated.")
+                return
+        finally:
+            for resource in (previous_base, previous_enhanced, texts):
+                if resource is not None:
+                    resource.close()
+
+        try:
+            # Vectors of files re-indexed since the last embed were built from their older records.
+            counts = update_vector_store(chunks, idx_dir, src_dir, dropped | set(unembedded), full,
+                                         make_embedder(embedder, embed_batch, embedding_cache, metrics),
+                                         dict(manifest, **unembedded), metrics)
+        except StoreLoadError as e:
+            # Nothing has been saved over the old store or manifest yet. Summaries
+            # and embeddings come from the caches, so the rebuild mostly re-parses.
+            print(f"⚠️ Could not load existing FAISS index, rebuilding every file: {e}")
+            # The rebuild writes the metrics; this attempt's are dropped.
+            rebuild_metrics, metrics_file = metrics_file, None
+            return build_ai_index(src_dir, idx_dir, full=True, workers=workers, rpm=rpm, tpm=tpm,
+                                  summary_cache=summary_cache, batch_tokens=batch_tokens, embedder=embedder,
+                                  embed_batch=embed_batch, embedding_cache=embedding_cache,
+                                  scan_workers=scan_workers, stage=stage, metrics_file=rebuild_metrics,
+                                  llm=llm)
+        for rel_path in changed:
+            files[rel_path]["chunks"] = counts.get(rel_path, 0)
+        # Written last so an interrupted build is redone on the next run.
+        save_manifest(src_dir, files, embedder_name(embedder))
+    finally:
+        if metrics_file:
+            metrics.save(metrics_file, **info)
+            print(f"📊 Saved build metrics to {metrics_file}")
+
+# Runs fn under cProfile, dumps the stats to path and prints the top entries.
+def run_profiled(path, fn, *args, **kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"🧪 Saved profile to {path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Build and enhance AI-readable project index")
     parser.add_argument("--src", "-s", default=".", help="Source project directory to scan")
     parser.add_argument("--index", "-i", default="faiss_index", help="Output directory for FAISS index")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild everything")
+    parser.add_argument("--workers", type=int, default=SUMMARY_WORKERS, help="Concurrent summarization requests")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE, help="Summarization requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Summarization tokens per minute (0 = unlimited)")
+    parser.add_argument("--summary-cache", default=SUMMARY_CACHE_FILE, help="SQLite summary cache file ('' to disable)")
+    parser.add_argument("--batch-tokens", type=int, default=SUMMARY_BATCH_TOKENS, help="Prompt-token budget per batched summary request (0 = one request per entry)")
+    parser.add_argument("--embedder", choices=["openai", "hash"], default=EMBEDDER, help="Embedding backend ('hash' is offline and deterministic)")
+    parser.add_argument("--embed-batch", type=int, default=EMBED_BATCH_SIZE, help="Texts per embedding request")
+    parser.add_argument("--embedding-cache", default=EMBEDDING_CACHE_DIR, help="Embedding cache directory ('' to disable)")
+    parser.add_argument("--rules", help="JSON file with extra tag/framework rules")
+    parser.add_argument("--scan-workers", type=int, default=SCAN_WORKERS, help="Processes used to read and parse files")
+    parser.add_argument("--stage", choices=STAGES, default="embed", help="Stop after this stage (the manifest is saved from 'tag' on, so later runs stay incremental)")
+    parser.add_argument("--no-llm", action="store_true", help="Never call the chat API; uncached summaries are skipped and filled in by a later run (fully offline with --embedder hash)")
+    parser.add_argument("--metrics", default=METRICS_FILE, help="JSON file for per-stage timings and API stats ('' to disable)")
+    parser.add_argument("--profile", help="Run the build under cProfile and save the stats to this file")
     args = parser.parse_args()
 
-    build_ai_index(args.src, args.index)
+    if args.rules:
+        load_rules(args.rules)
+    options = dict(full=args.full,
+                   workers=args.workers, rpm=args.rpm, tpm=args.tpm,
+                   summary_cache=args.summary_cache, batch_tokens=args.batch_tokens,
+                   embedder=args.embedder, embed_batch=args.embed_batch,
+                   embedding_cache=args.embedding_cache, scan_workers=args.scan_workers,
+                   stage=args.stage, metrics_file=args.metrics, llm=not args.no_llm)
+    if args.profile:
+        run_profiled(args.profile, build_ai_index, args.src, args.index, **options)
+    else:
+        build_ai_index(args.src, args.index, **options)
@@ -1,7 +1,16 @@
+import io
 import os
 
-def combine_files_in_directory(directory, output_file):
-    with open(output_file, 'w') as outfile:
+# Contents are copied in chunks of this many characters through a large write buffer
+CHUNK_SIZE = 1 << 20
+BUFFER_SIZE = 8 << 20
+# Files with a NUL byte in their first SNIFF_SIZE bytes are treated as binary and skipped
+SNIFF_SIZE = 8192
+# At most this many characters of each file are copied (0 = no limit)
+MAX_FILE_SIZE = 10 << 20
+
+def combine_files_in_directory(directory, output_file, max_file_size=MAX_FILE_SIZE):
+    with open(output_file, 'w', buffering=BUFFER_SIZE) as outfile:
         # Traverse the directory recursively
         for root, dirs, files in os.walk(directory):
             # Ignore directories that start with '__' or are hidden (dot directories)
@@ -16,10 +25,24 @@ def combine_files_in_directory(directory, output_file):
                 relative_path = os.path.relpath(file_path, directory)
 
                 try:
-                    with open(file_path, 'r') as infile:
+                    with open(file_path, 'rb') as raw:
+                        if b'\0' in raw.read(SNIFF_SIZE):
+                            print(f"Skipping binary file {file_path}")
+                            continue
+                        raw.seek(0)
+                        infile = io.TextIOWrapper(raw)
                         # Write the relative file path as a header
                         outfile.write(f"\n\n--- File: {relative_path} ---\n\n")
-                        outfile.write(infile.read())
+                        # Stream the content so large files never sit in memory whole
+                        remaining = max_file_size or float('inf')
+                        while remaining > 0:
+                            chunk = infile.read(int(min(CHUNK_SIZE, remaining)))
+                            if not chunk:
+                                break
+                            outfile.write(chunk)
+                            remaining -= len(chunk)
+                        if max_file_size and infile.read(1):
+                            outfile.write(f"\n[... truncated after {max_file_size} characters ...]")
                         outfile.write("\n")  # Add a newline after file content
                 except Exception as e:
                     print(f"Could not read {file_path}: {e}")
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import threading
+import contextlib
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+from build_ai_index import (
+    EMBEDDER, LEXICAL_FILE, MANIFEST_FILE, OUTPUT_FILE, IndexReader, LexicalIndex, make_embedder,
+)
+
+QUERY_CACHE_SIZE = 1024
+DEFAULT_K = 5
+# Reciprocal rank fusion constant for hybrid lexical + vector ranking.
+RRF_K = 60
+HOST = "127.0.0.1"
+PORT = 8008
+
+
+def manifest_embedder():
+    # Queries must be embedded by the same backend that built the index.
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            name = json.load(f).get("embedder", "")
+    except (OSError, ValueError):
+        return EMBEDDER
+    return "hash" if name.startswith("hash") else "openai"
+
+
+def load_store(idx_dir, embedder):
+    # The flat vector codes are memory-mapped rather than copied onto the heap.
+    path = os.path.join(idx_dir, "index.faiss")
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    try:
+        index = faiss.read_index(path, flags)
+    except RuntimeError:
+        index = faiss.read_index(path)
+    with open(os.path.join(idx_dir, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embedder, index, docstore, index_to_docstore_id)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class IndexSnapshot:
+    """One loaded generation of the vector store, enhanced index and lexical index.
+    Requests hold it while they read, so reload() never closes files still in use."""
+
+    def __init__(self, store, reader, lexical):
+        self.store = store
+        self.reader = reader
+        self.lexical = lexical
+        self.cached_search = None
+        self.users = 0
+        self.retired = False
+
+    def close(self):
+        for resource in (self.reader, self.lexical):
+            if resource is not None:
+                resource.close()
+
+
+class QueryService:
+    """Keeps the vector store and the enhanced index open and answers top-k queries."""
+
+    def __init__(self, idx_dir, index_file=OUTPUT_FILE, embedder=None, cache_size=QUERY_CACHE_SIZE,
+                 lexical_file=LEXICAL_FILE):
+        self.idx_dir = idx_dir
+        self.index_file = index_file
+        self.lexical_file = lexical_file
+        self.embedder_name = embedder or manifest_embedder()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.reload()
+
+    def reload(self):
+        embedder = make_embedder(self.embedder_name, cache_dir=None)
+        store = load_store(self.idx_dir, embedder)
+        reader = IndexReader(self.index_file)
+        lexical = None
+        if os.path.exists(self.lexical_file):
+            lexical = LexicalIndex(self.lexical_file)
+            if lexical.source_size != len(reader.mm):
+                print(f"⚠️ {self.lexical_file} is out of date with {self.index_file}; lexical search disabled")
+                lexical.close()
+                lexical = None
+        snapshot = IndexSnapshot(store, reader, lexical)
+        snapshot.cached_search = lru_cache(maxsize=self.cache_size)(partial(self.search, snapshot=snapshot))
+        with self.lock:
+            old, self.snapshot = self.snapshot, snapshot
+            self.store, self.reader, self.lexical = store, reader, lexical
+            self.cached_search = snapshot.cached_search
+            # The old files are closed here, or by the last request still reading them.
+            if old is not None:
+                old.retired = True
+            idle = old is not None and not old.users
+        if idle:
+            old.close()
+        print(f"📦 Loaded {store.index.ntotal} vectors and {len(reader)} index entries")
+
+    @contextlib.contextmanager
+    def acquire(self):
+        # Server threads read through the snapshot current when they started.
+        with self.lock:
+            snapshot = self.snapshot
+            snapshot.users += 1
+        try:
+            yield snapshot
+        finally:
+            with self.lock:
+                snapshot.users -= 1
+                idle = snapshot.retired and not snapshot.users
+            if idle:
+                snapshot.close()
+
+    def entries_for(self, reader, metadata):
+        entries = reader.by_path(metadata.get("path", ""))
+        start, end = metadata.get("start_line"), metadata.get("end_line")
+        if start is not None:
+            # Pieces of a split unit only cover part of it, so any overlap counts.
+            spanned = [e for e in entries if e["type"] != "file"
+                       and e["lineno"] <= end and e.get("end_lineno", e["lineno"]) >= start]
+            entries = spanned or [e for e in entries if e["type"] == "file"]
+        return entries
+
+    def search(self, text, k=DEFAULT_K, snapshot=None):
+        if snapshot is None:
+            with self.acquire() as snapshot:
+                return self.search(text, k, snapshot)
+        hits = snapshot.store.similarity_search_with_score(text, k=k)
+        return [{
+            "score": float(score),
+            "path": doc.metadata.get("path"),
+            "start_line": doc.metadata.get("start_line"),
+            "end_line": doc.metadata.get("end_line"),
+            "symbols": doc.metadata.get("symbols", []),
+            "text": doc.page_content,
+            "entries": self.entries_for(snapshot.reader, doc.metadata),
+        } for doc, score in hits]
+
+    def query(self, text, k=DEFAULT_K):
+        with self.acquire() as snapshot:
+            return snapshot.cached_search(text, k)
+
+    # Exact lookups ("symbol", "tag" or "path") need no embedding call at all.
+    def lookup(self, kind, value):
+        with self.acquire() as snapshot:
+            if snapshot.lexical is None:
+                return []
+            ids = getattr(snapshot.lexical, kind)(value)
+            return [snapshot.reader.entry_at(snapshot.lexical.entry_offset(i)) for i in ids]
+
+    def lexical_search(self, text, k=DEFAULT_K):
+        with self.acquire() as snapshot:
+            if snapshot.lexical is None:
+                return []
+            return [dict(snapshot.reader.entry_at(snapshot.lexical.entry_offset(i)), score=score)
+                    for i, score in snapshot.lexical.search(text, k)]
+
+    def hybrid(self, text, k=DEFAULT_K):
+        fused = {}
+
+        def add(entry, rank):
+            key = (entry["path"], entry["lineno"], entry["name"])
+            item = fused.setdefault(key, dict(entry, score=0.0))
+            item["score"] += 1.0 / (RRF_K + rank)
+
+        for rank, entry in enumerate(self.lexical_search(text, 2 * k), 1):
+            add(entry, rank)
+        rank = 0
+        for hit in self.query(text, 2 * k):
+            for entry in hit["entries"]:
+                rank += 1
+                add(entry, rank)
+        return sorted(fused.values(), key=lambda item: -item["score"])[:k]
+
+    def cache_info(self):
+        return self.cached_search.cache_info()
+
+
+def benchmark(service, queries, k=DEFAULT_K, rounds=3):
+    cold, warm, symbol, lexical = [], [], [], []
+    for text in queries:
+        start = time.perf_counter()
+        service.search(text, k)
+        cold.append((time.perf_counter() - start) * 1000)
+        service.query(text, k)
+        if service.lexical is not None:
+            start = time.perf_counter()
+            service.lexical.symbol(text)
+            symbol.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            service.lexical.search(text, k)
+            lexical.append((time.perf_counter() - start) * 1000)
+    for _ in range(rounds):
+        for text in queries:
+            start = time.perf_counter()
+            service.query(text, k)
+            warm.append((time.perf_counter() - start) * 1000)
+    for label, samples in (("uncached", cold), ("cached", warm), ("symbol lookup", symbol), ("bm25", lexical)):
+        if not samples:
+            continue
+        print(f"⏱️ {label}: {len(samples)} queries, p50 {percentile(samples, 50):.3f} ms, "
+              f"p99 {percentile(samples, 99):.3f} ms")
+
+
+def benchmark_queries(service, count):
+    # Entry names make a repeatable query set that resembles real lookups.
+    names = []
+    for entry in service.reader:
+        if entry["name"] not in names:
+            names.append(entry["name"])
+            if len(names) == count:
+                break
+    return names
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == "/query":
+                text = params.get("q", [""])[0]
+                if not text:
+                    return self.send_json(400, {"error": "missing q"})
+                try:
+                    k = int(params.get("k", [DEFAULT_K])[0])
+                except ValueError:
+                    return self.send_json(400, {"error": "k must be an integer"})
+                start = time.perf_counter()
+                results = service.query(text, k)
+                elapsed = (time.perf_counter() - start) * 1000
+                return self.send_json(200, {"query": text, "ms": round(elapsed, 3), "results": results})
+            if url.path in ("/symbol", "/tag", "/path"):
+                value = params.get("q", [""])[0]
+                if not value:
+                    return self.send_json(400, {"error": "missing q"})
+                return self.send_json(200, {"results": service.lookup(url.path[1:], value)})
+            if url.path in ("/lexical", "/hybrid"):
+                text = params.get("q", [""])[0]
+                if not text:
+                    return self.send_json(400, {"error": "missing q"})
+                try:
+                    k = int(params.get("k", [DEFAULT_K])[0])
+                except ValueError:
+                    return self.send_json(400, {"error": "k must be an integer"})
+                search = service.lexical_search if url.path == "/lexical" else service.hybrid
+                return self.send_json(200, {"query": text, "results": search(text, k)})
+            if url.path == "/reload":
+                service.reload()
+                return self.send_json(200, {"status": "reloaded"})
+            if url.path == "/health":
+                info = service.cache_info()
+                return self.send_json(200, {"status": "ok", "cache_hits": info.hits, "cache_misses": info.misses})
+            return self.send_json(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the FAISS index and enhanced master index built by build_ai_index.py")
+    parser.add_argument("query", nargs="?", help="Text to search for")
+    parser.add_argument("--index", "-i", default="faiss_index", help="FAISS index directory")
+    parser.add_argument("--entries", default=OUTPUT_FILE, help="Enhanced master index (JSONL)")
+    parser.add_argument("--embedder", choices=["openai", "hash"], help="Embedding backend (default: the one recorded in the manifest)")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="Number of results")
+    parser.add_argument("--cache-size", type=int, default=QUERY_CACHE_SIZE, help="LRU query cache size")
+    parser.add_argument("--symbol", help="Exact symbol name lookup (no embedding call)")
+    parser.add_argument("--tag", help="All entries with a tag, e.g. '#auth'")
+    parser.add_argument("--path", help="All entries under a path prefix, e.g. 'api/'")
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default="vector", help="Ranking used for the query text")
+    parser.add_argument("--serve", action="store_true", help="Run a local HTTP server (GET /query?q=...&k=5)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--bench", type=int, metavar="N", help="Benchmark N queries and report p50/p99 latency")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.index):
+        print(f"ERROR: FAISS index not found: '{args.index}'")
+        sys.exit(1)
+    service = QueryService(args.index, args.entries, args.embedder, args.cache_size)
+
+    if args.bench:
+        benchmark(service, benchmark_queries(service, args.bench), args.k)
+    for kind in ("symbol", "tag", "path"):
+        value = getattr(args, kind)
+        if value:
+            for entry in service.lookup(kind, value):
+                print(f"{entry['path']}:{entry['lineno']}  {entry['type']} {entry['name']}: {entry.get('summary', '')}")
+    if args.query and args.mode != "vector":
+        search = service.lexical_search if args.mode == "lexical" else service.hybrid
+        for entry in search(args.query, args.k):
+            print(f"{entry['score']:.4f}  {entry['path']}:{entry['lineno']}  {entry['type']} {entry['name']}: "
+                  f"{entry.get('summary', '')}")
+    elif args.query:
+        for result in service.query(args.query, args.k):
+            symbols = ", ".join(result["symbols"])
+            print(f"{result['score']:.4f}  {result['path']}:{result['start_line']}-{result['end_line']}  {symbols}")
+            for entry in result["entries"]:
+                print(f"    {entry['type']} {entry['name']}: {entry.get('summary', '')}")
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+        print(f"🚀 Serving queries on http://{args.host}:{args.port}/query?q=...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif not (args.query or args.bench or args.symbol or args.tag or args.path):
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
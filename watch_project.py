@@ -0,0 +1,265 @@
+import os
+import sys
+import time
+import errno
+import ctypes
+import select
+import struct
+import argparse
+import ctypes.util
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Programming"))
+
+import build_ai_index
+import create_overview
+
+# Changes are applied once the tree has been quiet for this long.
+DEBOUNCE_SECONDS = 0.5
+# The polling fallback re-stats the whole tree this often.
+POLL_INTERVAL = 2.0
+OVERVIEW_FILE = "Project_Overview.txt"
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+# IN_MODIFY is left out: a save fires it once per write, IN_CLOSE_WRITE once at the end.
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_ATTRIB | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+# Blocks in select() on an inotify descriptor, so an idle watch costs no CPU.
+# wait() returns the set of touched paths, or None when events were lost (queue
+# overflow, a directory moved away) and the caller has to rescan.
+class InotifyWatcher:
+    def __init__(self, root, skip_dir):
+        self.skip_dir = skip_dir
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.dirs = {}
+        try:
+            self.add_tree(root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_tree(self, top):
+        files = []
+        for root, dirs, names in os.walk(top):
+            dirs[:] = [d for d in dirs if not self.skip_dir(os.path.join(root, d))]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOSPC, errno.ENOMEM):
+                    raise OSError(err, f"inotify watch limit reached ({os.strerror(err)})")
+                continue  # Removed before we got to it.
+            self.dirs[wd] = root
+            files.extend(os.path.join(root, name) for name in names)
+        return files
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        touched, rescan = set(), False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if not mask & IN_ISDIR:
+                touched.add(path)
+            elif self.skip_dir(path):
+                continue
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                # Files can land in a new directory before its watch exists.
+                touched.update(self.add_tree(path))
+            elif mask & IN_MOVED_FROM:
+                rescan = True
+        return None if rescan else touched
+
+    def close(self):
+        os.close(self.fd)
+
+
+# Fallback for systems without inotify (or out of watches): compares size and
+# mtime of every file each interval, so idle cost grows with the tree.
+class PollingWatcher:
+    def __init__(self, root, skip_dir, interval=POLL_INTERVAL):
+        self.root = root
+        self.skip_dir = skip_dir
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not self.skip_dir(os.path.join(root, d))]
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        previous, self.snapshot = self.snapshot, self.scan()
+        return {path for path in previous.keys() | self.snapshot.keys()
+                if previous.get(path) != self.snapshot.get(path)}
+
+    def close(self):
+        pass
+
+
+def make_watcher(root, skip_dir, backend="auto", interval=POLL_INTERVAL):
+    if backend != "poll":
+        try:
+            watcher = InotifyWatcher(root, skip_dir)
+            print(f"👀 Watching {len(watcher.dirs)} directories with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            print(f"⚠️ inotify unavailable ({e}), polling every {interval:g}s")
+    return PollingWatcher(root, skip_dir, interval)
+
+
+# Absolute paths of everything the overview and build_ai_index write (most of it
+# into the working directory), with the temp, side and journal files next to
+# them. Watching "." must neither react to nor list its own output.
+def output_paths(overview_file, idx_dir, index_options):
+    overview_dir, name = os.path.split(os.path.abspath(overview_file))
+    paths = [overview_file, os.path.join(overview_dir, f".{name}.tmp")]
+    paths += [create_overview.default_cache_file + suffix for suffix in ("", "-journal", "-wal", "-shm")]
+    idx_dir = os.path.normpath(idx_dir)
+    paths += [idx_dir, idx_dir + ".tmp", idx_dir + ".old"]
+    paths += filter(None, [index_options.get("embedding_cache", build_ai_index.EMBEDDING_CACHE_DIR)])
+    files = [build_ai_index.INPUT_FILE, build_ai_index.OUTPUT_FILE, build_ai_index.LEXICAL_FILE,
+             build_ai_index.MANIFEST_FILE, build_ai_index.TEXT_TABLE_FILE,
+             index_options.get("metrics_file", build_ai_index.METRICS_FILE),
+             index_options.get("summary_cache", build_ai_index.SUMMARY_CACHE_FILE)]
+    for path in filter(None, files):
+        paths += [path + suffix for suffix in ("", ".tmp", ".idx", ".idx.tmp", "-journal", "-wal", "-shm")]
+    return {os.path.abspath(path) for path in paths}
+
+
+# Keeps the overview and the component index of src_dir up to date. Both are
+# built once at start-up; after that, events are collected until the tree has
+# been quiet for `debounce` seconds and only the touched files are processed.
+def watch(src_dir, overview_file=OVERVIEW_FILE, idx_dir="faiss_index", overview=True, index=True,
+          debounce=DEBOUNCE_SECONDS, backend="auto", interval=POLL_INTERVAL, workers=None,
+          index_options=None):
+    index_options = index_options or {}
+    root = os.path.abspath(src_dir)
+    outputs = output_paths(overview_file, idx_dir, index_options)
+    # A directory is only left unwatched if every enabled output skips it.
+    skips = [lambda d: d == ".git"]
+    if overview:
+        skips.append(create_overview.is_excluded_dir)
+    if index:
+        skips.append(lambda d: d in build_ai_index.EXCLUDE_DIRS)
+    skip_name = lambda d: skips[0](d) or all(skip(d) for skip in skips[1:])
+    skip_dir = lambda path: skip_name(os.path.basename(path)) or os.path.abspath(path) in outputs
+
+    cache = create_overview.open_cache(create_overview.default_cache_file) if overview else None
+    state = None
+    if overview:
+        state = create_overview.IncrementalOverview(src_dir, overview_file, workers, cache, exclude=outputs)
+
+    def relevant(path):
+        if create_overview.is_excluded_path(path, outputs):
+            return False
+        if state is not None and state.file_path(path) is not None:
+            return True
+        return index and build_ai_index.is_source_file(os.path.relpath(path, root))
+
+    def apply(touched):
+        start = time.perf_counter()
+        if state is not None:
+            count, _ = state.update(touched)
+            print(f"📝 Overview updated ({count} files re-read) in {overview_file}")
+        if index:
+            rel_paths = None if touched is None else {os.path.relpath(path, root) for path in touched}
+            build_ai_index.build_ai_index(src_dir, idx_dir, touched=rel_paths, **index_options)
+        print(f"🔄 Applied {'a rescan' if touched is None else f'{len(touched)} changes'} "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    watcher = None
+    try:
+        if state is not None:
+            state.build()
+            print(f"📝 Overview written to {overview_file}")
+        if index:
+            build_ai_index.build_ai_index(src_dir, idx_dir, **index_options)
+        watcher = make_watcher(root, skip_dir, backend, interval)
+        pending, rescan, deadline = set(), False, None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = watcher.wait(timeout)
+            if events is None or any(relevant(path) for path in events):
+                rescan = rescan or events is None
+                pending.update(path for path in events or () if relevant(path))
+                deadline = time.monotonic() + debounce
+            elif deadline is not None and time.monotonic() >= deadline:
+                try:
+                    apply(None if rescan else pending)
+                except Exception as e:
+                    # Keep watching; the next change (or a restart) retries.
+                    print(f"⚠️ Update failed: {e}")
+                pending, rescan, deadline = set(), False, None
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        if watcher:
+            watcher.close()
+        if cache:
+            cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the project overview and AI index up to date as files change")
+    parser.add_argument("--src", "-s", default=".", help="Source project directory to watch")
+    parser.add_argument("--index", "-i", default="faiss_index", help="Output directory for FAISS index")
+    parser.add_argument("--overview", default=OVERVIEW_FILE, help="Overview file to keep up to date")
+    parser.add_argument("--no-overview", action="store_true", help="Only maintain the AI index")
+    parser.add_argument("--no-index", action="store_true", help="Only maintain the overview")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, help="Seconds of quiet before changes are applied")
+    parser.add_argument("--backend", choices=["auto", "inotify", "poll"], default="auto", help="How to detect changes")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Seconds between scans of the polling backend")
+    parser.add_argument("--workers", type=int, help="Processes used to analyze Python files for the overview")
+    parser.add_argument("--embedder", choices=["openai", "hash"], default=build_ai_index.EMBEDDER, help="Embedding backend ('hash' is offline and deterministic)")
+    parser.add_argument("--stage", choices=build_ai_index.STAGES, default="embed", help="Stop index updates after this stage ('scan' and 'parse' re-read every file each time)")
+    parser.add_argument("--no-llm", action="store_true", help="Never call the chat API; uncached summaries are skipped (fully offline with --embedder hash)")
+    args = parser.parse_args()
+
+    if args.no_overview and args.no_index:
+        parser.error("nothing to watch with both --no-overview and --no-index")
+    watch(args.src, args.overview, args.index, overview=not args.no_overview, index=not args.no_index,
+          debounce=args.debounce, backend=args.backend, interval=args.poll_interval, workers=args.workers,
+          index_options=dict(embedder=args.embedder, stage=args.stage, llm=not args.no_llm))